@@ -1,37 +1,42 @@
-from fastapi import APIRouter
-from pymongo import MongoClient
-import os
+from fastapi import APIRouter, HTTPException, Query
 from datetime import datetime, timedelta
 
+import metrics
+import rollups
+from mongo import mongo
+
 router = APIRouter()
 
-MONGO_URI = os.getenv("MONGO_URI")
-client = None
-db = None
-col = None
-
-# Try to connect to MongoDB, but don't fail if it's not available
-try:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
-    db = client["civic_db"]
-    col = db["complaints"]
-    # Test the connection
-    client.server_info()
-except Exception as e:
-    print(f"MongoDB connection failed: {e}")
-    client = None
-    db = None
-    col = None
+MAX_SUMMARY_DAYS = 366
+
+
+# Connection is lazy and non-blocking: the health loop starts with the app
+# and keeps reconnecting in the background if MongoDB is down.
+@router.on_event("startup")
+async def start_mongo():
+    mongo.start()
+
+
+@router.on_event("shutdown")
+async def stop_mongo():
+    await mongo.close()
+
+
+@mongo.on_connect
+async def prepare_rollups(db):
+    await rollups.ensure_indexes(db)
 
 @router.get("/timeline")
-def incident_timeline():
+async def incident_timeline():
     labels = []
     potholes = []
     garbage = []
     electricity = []
 
+    db = mongo.get_db()
+
     # If MongoDB is not available, return sample data
-    if col is None:
+    if db is None:
         # Generate sample data for the last 7 days
         for i in range(7):
             day = datetime.utcnow() - timedelta(days=i)
@@ -42,26 +47,49 @@ def incident_timeline():
             garbage.insert(0, max(0, 10 + i))   # Increasing trend
             electricity.insert(0, max(0, 5 + i % 3))  # Fluctuating trend
     else:
-        # Use real data from MongoDB
-        for i in range(7):  # last 7 days
-            day = datetime.utcnow() - timedelta(days=i)
-            date_str = day.strftime("%Y-%m-%d")
-            labels.insert(0, date_str)
+        # Use the pre-aggregated daily_counts rollup from MongoDB
+        dates = [
+            (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(6, -1, -1)  # last 7 days, oldest first
+        ]
+        labels.extend(dates)
 
-            try:
-                potholes.insert(0, col.count_documents({"category": "Pothole", "date": date_str}))
-                garbage.insert(0, col.count_documents({"category": "Garbage", "date": date_str}))
-                electricity.insert(0, col.count_documents({"category": "Electricity", "date": date_str}))
-            except Exception as e:
-                print(f"Error querying MongoDB: {e}")
-                # Fallback to sample data if query fails
-                potholes.insert(0, max(0, 15 - i))
-                garbage.insert(0, max(0, 10 + i))
-                electricity.insert(0, max(0, 5 + i % 3))
+        try:
+            with metrics.stage("mongo_query"):
+                counts = await rollups.daily_counts(db, dates, ["Pothole", "Garbage", "Electricity"])
+            for d in dates:
+                potholes.append(counts.get((d, "Pothole"), 0))
+                garbage.append(counts.get((d, "Garbage"), 0))
+                electricity.append(counts.get((d, "Electricity"), 0))
+        except Exception as e:
+            metrics.record_error("timeline", e)
+            # Fallback to sample data if query fails
+            potholes[:] = [max(0, 15 - i) for i in range(6, -1, -1)]
+            garbage[:] = [max(0, 10 + i) for i in range(6, -1, -1)]
+            electricity[:] = [max(0, 5 + i % 3) for i in range(6, -1, -1)]
 
     return {
         "labels": labels,
         "potholes": potholes,
         "garbage": garbage,
         "electricity": electricity
-    }
\ No newline at end of file
+    }
+
+@router.get("/analytics/summary")
+async def analytics_summary(days: int = Query(30, ge=1, le=MAX_SUMMARY_DAYS), group_by: str = "category"):
+    """Complaint counts over the last `days` days, grouped by category, area or urgency."""
+    if group_by not in ("category", "area", "urgency"):
+        raise HTTPException(status_code=400, detail="group_by must be category, area or urgency")
+    db = mongo.get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="MongoDB not available")
+
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    with metrics.stage("mongo_query"):
+        counts = await rollups.summary(db, since, group_by)
+    return {"since": since, "group_by": group_by, "counts": counts}
+
+
+@router.get("/analytics/health")
+def analytics_health():
+    return {"mongo": mongo.status()}
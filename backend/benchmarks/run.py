@@ -0,0 +1,390 @@
+# benchmarks/run.py — offline performance benchmarks for the backend hot paths
+#
+#   cd backend
+#   python -m benchmarks.run                          # all sections
+#   python -m benchmarks.run --only predict,analyze   # some sections
+#   python -m benchmarks.run --compare old.json new.json
+#
+# Uses synthetic data (benchmarks/synthetic.py) and a stub LLM, so no Gemini
+# key, MongoDB or network is needed (the embedder must be available locally).
+# Results are written to benchmarks/results/<commit>.json.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from benchmarks import synthetic
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentiles(samples_ms):
+    s = sorted(samples_ms)
+    if not s:
+        return {}
+
+    def pct(p):
+        return round(s[min(len(s) - 1, int(p / 100 * len(s)))], 3)
+
+    return {"p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "mean_ms": round(sum(s) / len(s), 3), "n": len(s)}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+@contextmanager
+def working_dir(path):
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+# ------------------------------------------------------
+# SECTIONS
+# ------------------------------------------------------
+def bench_predict(args):
+    """Classifier throughput: single /predict calls and vectorized batches."""
+    import predict_server
+    from shared_models import models
+
+    models.load_all(rag=False)
+    texts = [c["ComplaintText"] for c in synthetic.complaints(2000)]
+
+    single = timed(lambda it=iter(texts * 10): predict_server.predict(
+        predict_server.PredictIn(text=next(it))), 1000)
+
+    out = {"single": percentiles(single),
+           "single_per_sec": round(1000 / (sum(single) / len(single)), 1)}
+    for batch in (32, 256, 2000):
+        t0 = time.perf_counter()
+        X = models.vectorizer.transform(texts[:batch])
+        models.cat_model.predict(X)
+        models.urg_model.predict(X)
+        out[f"batch_{batch}_per_sec"] = round(batch / (time.perf_counter() - t0), 1)
+    return out
+
+
+def bench_retrieve(args):
+    """retrieve_docs latency (embed + vector query) as the corpus grows."""
+    import chromadb
+    import numpy as np
+    import combined_server
+    from shared_models import models
+
+    embedder = models.embedder
+    queries = [c["ComplaintText"] for c in synthetic.complaints(50, seed=3)]
+    embed_ms = timed(lambda it=iter(queries * 4): embedder.encode([next(it)]), 100)
+
+    out = {"embed": percentiles(embed_ms), "corpus": {}}
+    rng = np.random.default_rng(0)
+    client = chromadb.EphemeralClient()
+    for size in args.corpus_sizes:
+        name = f"bench_{size}"
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass
+        col = client.create_collection(name)
+        for start in range(0, size, 5000):
+            n = min(5000, size - start)
+            vecs = rng.standard_normal((n, 384)).astype("float32")
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+            col.add(ids=[f"d{start + i}" for i in range(n)],
+                    embeddings=vecs.tolist(),
+                    documents=[f"synthetic chunk {start + i}" for i in range(n)],
+                    metadatas=[{"source": "synthetic"}] * n)
+        # the real retrieve_docs, pointed at the synthetic collection
+        models._loaded["collection"] = col
+        if not combined_server.retrieve_docs(queries[0], 3):  # it returns [] on any error
+            raise RuntimeError("retrieve_docs found nothing; see the logged retrieve_docs error")
+        retrieve_ms = timed(lambda it=iter(queries * 4): combined_server.retrieve_docs(next(it), 3), 100)
+        out["corpus"][str(size)] = percentiles(retrieve_ms)
+        models._loaded.pop("collection")
+        client.delete_collection(name)
+    return out
+
+
+def bench_hotspots(args):
+    """/hotspots latency vs number of complaints: all-time CSV vs windowed engine."""
+    import combined_server
+    from hotspot_engine import HotspotEngine
+
+    out = {"engine": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "data"))
+        with working_dir(tmp):
+            for rows in args.csv_rows:
+                synthetic.write_complaints_csv("data/complaints_hdmc.csv", rows)
+                combined_server.csv_hotspots()  # warm-up
+                samples = timed(combined_server.csv_hotspots, args.repeat)
+                out[str(rows)] = percentiles(samples)
+
+    # the same complaint counts spread over 30 days on a ~2000-cell grid
+    rng = random.Random(0)
+    now = time.time()
+    for rows in args.csv_rows:
+        engine = HotspotEngine()
+        t0 = time.perf_counter()
+        for _ in range(rows):
+            engine.add(now - rng.random() * 30 * 86400,
+                       15.30 + rng.randrange(50) * 0.002, 75.10 + rng.randrange(40) * 0.002,
+                       "Synthetic", rng.choice(["Low", "Medium", "High"]), "synthetic complaint")
+        ingest = time.perf_counter() - t0
+        result = {"cells": len(engine.cells), "events_per_sec": round(rows / ingest, 1)}
+        for window in ("24h", "7d", "30d"):
+            result[window] = percentiles(timed(lambda: engine.hotspots(window, now=now), args.repeat))
+        out["engine"][str(rows)] = result
+    return out
+
+
+def bench_build_index(args):
+    """build_index.py chunking (and embedding) throughput."""
+    sys.path.insert(0, str(BACKEND_DIR.parent))
+    import build_index
+
+    docs = synthetic.corpus_documents(args.index_docs)
+    chars = sum(len(d["text"]) for d in docs)
+    t0 = time.perf_counter()
+    chunks = build_index.chunk_documents(docs)
+    elapsed = time.perf_counter() - t0
+    out = {"docs": len(docs), "chars": chars, "chunks": len(chunks),
+           "chunks_per_sec": round(len(chunks) / elapsed, 1),
+           "mb_per_sec": round(chars / elapsed / 1e6, 2)}
+
+    from shared_models import models
+
+    sample = [c["text"] for c in chunks[:512]]
+    t0 = time.perf_counter()
+    models.embedder.encode(sample, batch_size=64)
+    out["embed_chunks_per_sec"] = round(len(sample) / (time.perf_counter() - t0), 1)
+    return out
+
+
+def bench_analyze(args):
+    """Full /analyze over HTTP (ASGI, in-process) under concurrency with a stub LLM."""
+    import httpx
+    import combined_server
+    from complaint_store import SQLiteComplaintStore
+    from incident_index import IncidentIndex
+    from shared_models import models
+    from write_behind import WriteBehindWriter
+
+    models.warm_up()
+
+    def stub_llm(context, query):
+        time.sleep(args.stub_llm_ms / 1000)
+        return "Immediate Action: stub\nResponsible Department: stub"
+
+    combined_server.rag_answer = stub_llm
+    texts = [c["ComplaintText"] for c in synthetic.complaints(args.requests, seed=11)]
+
+    tmp = tempfile.mkdtemp(prefix="bench_analyze_")
+    store = SQLiteComplaintStore(os.path.join(tmp, "complaints.db"))
+
+    async def run(concurrency):
+        combined_server.incidents = IncidentIndex()  # unique texts, but start clean
+        combined_server.writer = WriteBehindWriter(lambda: store)
+        sem = asyncio.Semaphore(concurrency)
+        samples = []
+        transport = httpx.ASGITransport(app=combined_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def one(text):
+                async with sem:
+                    t0 = time.perf_counter()
+                    r = await client.post("/analyze", json={"text": text})
+                    r.raise_for_status()
+                    samples.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(one(t) for t in texts))
+            elapsed = time.perf_counter() - t0
+            await combined_server.writer.stop()
+        return {**percentiles(samples), "throughput_rps": round(len(samples) / elapsed, 1)}
+
+    return {"stub_llm_ms": args.stub_llm_ms,
+            "concurrency": {str(c): asyncio.run(run(c)) for c in args.concurrency}}
+
+
+def _listing_rows(n):
+    rows = []
+    for i, c in enumerate(synthetic.complaints(n, seed=5)):
+        rows.append({"id": str(i), "timestamp": "2025-01-01T00:00:00Z", "category": c["Category"],
+                     "urgency": c["Urgency"], "area": c["Area"], "lat": c["Latitude"],
+                     "lng": c["Longitude"], "image": None, "yolo_boxes": None})
+    return rows
+
+
+def bench_serialize(args):
+    """Serialization time and bytes on the wire per endpoint payload: stdlib vs responses.py."""
+    import gzip
+
+    import pandas as pd
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+
+    import responses
+
+    rows = _listing_rows(args.payload_rows)
+    hotspots = pd.DataFrame([{
+        "area": r["area"], "lat": round(r["lat"], 5), "lng": round(r["lng"], 5), "count": 3,
+        "avg_urgency_score": 1.67, "avg_urgency_label": "Medium", "sample_text": "Garbage not collected",
+    } for r in rows])
+    chunks = [{"id": f"doc__{i}", "text": d["text"][:800], "source": d["source"]}
+              for i, d in enumerate(synthetic.corpus_documents(10))]
+    analyze = {"category": "Garbage", "urgency": "High", "recommended_action": "x" * 600,
+               "retrieved": chunks, "degraded": False, "prompt_tokens": 512,
+               "context": {"chunks_in": 10}, "incident_id": "abc", "incident_reports": 1,
+               "duplicate": False}
+
+    payloads = {
+        # endpoint: (object the old code path serialized, object the new path serializes)
+        "hotspots": ({"hotspots": hotspots.to_dict("records")}, {"hotspots": hotspots}),
+        "list-issues": (rows, rows),
+        "complaints-map": ({"data": rows, "next_cursor": None}, {"data": rows, "next_cursor": None}),
+        "analyze": (analyze, analyze),
+    }
+    repeat = max(args.repeat, 20)
+    out = {}
+    for name, (old_obj, new_obj) in payloads.items():
+        body = responses.dumps(new_obj)
+        result = {
+            "stdlib": percentiles(timed(lambda: JSONResponse(jsonable_encoder(old_obj)).body, repeat)),
+            "fast": percentiles(timed(lambda: responses.dumps(new_obj), repeat)),
+            "bytes": len(body),
+        }
+        t0 = time.perf_counter()
+        result["gzip_bytes"] = len(gzip.compress(body, responses.GZIP_LEVEL))
+        result["gzip_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        if responses.brotli is not None:
+            t0 = time.perf_counter()
+            result["br_bytes"] = len(responses.brotli.compress(body, quality=responses.BROTLI_QUALITY))
+            result["br_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        out[name] = result
+    return out
+
+
+SECTIONS = {
+    "predict": bench_predict,
+    "retrieve": bench_retrieve,
+    "hotspots": bench_hotspots,
+    "build_index": bench_build_index,
+    "analyze": bench_analyze,
+    "serialize": bench_serialize,
+}
+
+
+# ------------------------------------------------------
+# RESULTS
+# ------------------------------------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=BACKEND_DIR).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def compare(old_path, new_path, tolerance=0.10):
+    """Print metrics that moved by more than `tolerance` between two result files."""
+    old = json.loads(Path(old_path).read_text())["results"]
+    new = json.loads(Path(new_path).read_text())["results"]
+
+    def flatten(d, prefix=""):
+        for k, v in d.items():
+            key = f"{prefix}.{k}" if prefix else k
+            if isinstance(v, dict):
+                yield from flatten(v, key)
+            elif isinstance(v, (int, float)) and not isinstance(v, bool):
+                yield key, v
+
+    old_flat, regressions = dict(flatten(old)), 0
+    for key, value in flatten(new):
+        before = old_flat.get(key)
+        if not before:
+            continue
+        change = (value - before) / before
+        if abs(change) < tolerance:
+            continue
+        # latencies and payload sizes should go down, throughputs up
+        worse = change > 0 if key.endswith(("_ms", "bytes")) else change < 0
+        regressions += worse
+        print(f"{'✗' if worse else '✓'} {key}: {before} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline backend benchmarks")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(SECTIONS)}")
+    parser.add_argument("--output", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--stub-llm-ms", type=float, default=200)
+    parser.add_argument("--corpus-sizes", default="1000,10000,50000")
+    parser.add_argument("--csv-rows", default="5000,50000,200000")
+    parser.add_argument("--index-docs", type=int, default=200)
+    parser.add_argument("--payload-rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+
+    args.concurrency = [int(x) for x in args.concurrency.split(",")]
+    args.corpus_sizes = [int(x) for x in args.corpus_sizes.split(",")]
+    args.csv_rows = [int(x) for x in args.csv_rows.split(",")]
+    selected = args.only.split(",") if args.only else list(SECTIONS)
+
+    os.chdir(BACKEND_DIR)
+    os.environ.pop("GEMINI_API_KEY", None)
+    random.seed(0)
+
+    results = {}
+    for name in selected:
+        print(f"▶ {name}")
+        t0 = time.perf_counter()
+        try:
+            results[name] = SECTIONS[name](args)
+            print(json.dumps(results[name], indent=2))
+        except Exception as e:
+            print(f"✗ {name} failed: {e}")
+            results[name] = {"error": str(e)}
+        print(f"  ({time.perf_counter() - t0:.1f}s)")
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    out = Path(args.output) if args.output else RESULTS_DIR / f"{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"✓ Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/synthetic.py — deterministic synthetic complaints and RAG corpus
+#
+# Everything is seeded so two runs (or two commits) benchmark the same data.
+
+import csv
+import random
+
+AREAS = [
+    ("Gokul Road Market", 15.3442, 75.1435),
+    ("Old Hubli", 15.3647, 75.1239),
+    ("Vidyanagar", 15.3700, 75.1240),
+    ("Keshwapur", 15.3490, 75.1390),
+    ("Unkal Lake", 15.3947, 75.1039),
+    ("Dharwad Central", 15.4589, 75.0078),
+    ("Navanagar", 15.4010, 75.0820),
+    ("Deshpande Nagar", 15.3550, 75.1330),
+]
+
+TEMPLATES = {
+    "Pothole": [
+        "A big pothole near {area} is causing traffic jams and minor accidents.",
+        "Road surface broken near {area}, vehicles are getting damaged.",
+        "Deep crater on the main road at {area} filled with rain water.",
+    ],
+    "Garbage": [
+        "Garbage has not been collected in {area} for {n} days.",
+        "Overflowing dustbin near {area} is spreading bad smell.",
+        "People are dumping waste on the roadside at {area}.",
+    ],
+    "Electricity": [
+        "Street light not working near {area} since {n} days.",
+        "Transformer sparking near {area}, residents are scared.",
+        "Frequent power cuts in {area} during the evening.",
+    ],
+    "Drainage": [
+        "Drainage overflow in {area} near the market after rain.",
+        "Blocked sewer line at {area} causing water logging.",
+        "Open drain near {area} is a danger to children.",
+    ],
+    "Water Supply": [
+        "No water supply in {area} for {n} days.",
+        "Pipeline burst near {area}, water wasted on the road.",
+        "Contaminated water supplied to houses in {area}.",
+    ],
+}
+URGENCIES = ["Low", "Medium", "High"]
+
+CORPUS_SENTENCES = [
+    "Complaints about {topic} must be registered through the HDMC helpline or portal.",
+    "The {dept} department is responsible for {topic} across all wards.",
+    "High priority {topic} issues on arterial roads are resolved within {n} hours.",
+    "Citizens may escalate unresolved {topic} complaints to the ward officer after {n} days.",
+    "Field staff inspect reported {topic} sites and update the complaint status.",
+    "Emergency {topic} situations during monsoon are handled by the disaster cell.",
+]
+TOPICS = ["pothole repair", "garbage collection", "street lighting", "drainage cleaning",
+          "water supply", "stray animal control", "tree trimming", "encroachment removal"]
+DEPTS = ["Engineering", "Health and Sanitation", "Electrical", "Water Supply", "Revenue"]
+
+
+def complaints(n, seed=42, unique=True):
+    """Yield n complaint dicts shaped like rows of complaints_hdmc.csv."""
+    rng = random.Random(seed)
+    for i in range(n):
+        category = rng.choice(list(TEMPLATES))
+        area, lat, lng = rng.choice(AREAS)
+        text = rng.choice(TEMPLATES[category]).format(area=area, n=rng.randint(2, 14))
+        if unique:
+            text += f" Ref {i}."
+        yield {
+            "ComplaintText": text,
+            "Category": category,
+            "Urgency": rng.choice(URGENCIES),
+            "Area": area,
+            "Latitude": round(lat + rng.uniform(-0.01, 0.01), 6),
+            "Longitude": round(lng + rng.uniform(-0.01, 0.01), 6),
+        }
+
+
+def write_complaints_csv(path, n, seed=42):
+    fields = ["ComplaintText", "Category", "Urgency", "Area", "Latitude", "Longitude"]
+    with open(path, "w", newline="", encoding="utf8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(complaints(n, seed))
+    return path
+
+
+def corpus_documents(n_docs, sentences_per_doc=40, seed=7):
+    """Return build_index-style docs: [{"source", "text"}]."""
+    rng = random.Random(seed)
+    docs = []
+    for d in range(n_docs):
+        paragraphs = []
+        for _ in range(max(1, sentences_per_doc // 5)):
+            paragraphs.append(" ".join(
+                rng.choice(CORPUS_SENTENCES).format(
+                    topic=rng.choice(TOPICS), dept=rng.choice(DEPTS), n=rng.randint(2, 72))
+                for _ in range(5)
+            ))
+        docs.append({"source": f"synthetic_{d}.txt", "text": "\n\n".join(paragraphs)})
+    return docs
@@ -0,0 +1,267 @@
+# bulk_analyze.py — offline /analyze over a whole complaint archive
+#
+#   python bulk_analyze.py data/complaints_hdmc.csv                 # -> data/bulk/complaints_hdmc/
+#   python bulk_analyze.py archive.jsonl --workers 4 --generate gemini --concurrency 8
+#   python bulk_analyze.py data/complaints_hdmc.csv --generate none   # classify + retrieve only
+#
+# The input (CSV or JSONL, text column ComplaintText or text) is read in
+# chunks of --chunk-size rows. Worker processes, each holding one copy of the
+# models, classify a whole chunk with one vectorizer.transform() call, embed
+# it in batches and query Chroma with all of the chunk's embeddings at once.
+# The main process then runs the generation stage with at most --concurrency
+# calls in flight (--generate stub needs no network or API key) and writes the
+# chunk as a Parquet part file.
+#
+# Progress is checkpointed per chunk in <out>/_checkpoint.json; re-running the
+# same command after a crash skips finished chunks. Read the result with
+#   pd.read_parquet("data/bulk/complaints_hdmc")
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from pathlib import Path
+
+import runtime_config
+
+CHUNK_SIZE = 2000
+EMBED_BATCH = 64
+TEXT_COLUMNS = ("ComplaintText", "text")
+CHECKPOINT = "_checkpoint.json"
+
+
+# ------------------------------------------------------
+# INPUT
+# ------------------------------------------------------
+def iter_chunks(path, chunk_size):
+    """Yield (chunk_id, DataFrame) for a CSV or JSONL file, chunk_size rows at a time."""
+    import pandas as pd
+
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        reader = pd.read_json(path, lines=True, chunksize=chunk_size)
+    else:
+        reader = pd.read_csv(path, chunksize=chunk_size)
+    with reader:
+        for chunk_id, df in enumerate(reader):
+            yield chunk_id, df
+
+
+def text_column(df):
+    for c in TEXT_COLUMNS:
+        if c in df.columns:
+            return c
+    raise SystemExit(f"Input needs one of the columns {TEXT_COLUMNS}, got {list(df.columns)}")
+
+
+# ------------------------------------------------------
+# WORKER PROCESSES
+# ------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(workers, top_k, rag):
+    runtime_config.configure(workers=workers)
+    from shared_models import models
+
+    models.load_all(rag=rag)
+    _worker.update(models=models, top_k=top_k, rag=rag and models.rag_available)
+
+
+def analyze_chunk(chunk_id, first_row, texts):
+    """Classify and retrieve for a list of texts; returns column lists."""
+    from rag.context import assemble_context
+
+    models = _worker["models"]
+    t0 = time.perf_counter()
+    X = models.vectorizer.transform(texts)
+    out = {
+        "row": list(range(first_row, first_row + len(texts))),
+        "category": models.cat_model.predict(X).tolist(),
+        "urgency": models.urg_model.predict(X).tolist(),
+        "retrieved_ids": [[] for _ in texts],
+        "retrieved_sources": [[] for _ in texts],
+        "context": ["" for _ in texts],
+    }
+
+    if _worker["rag"]:
+        embeddings = models.embedder.encode(texts, batch_size=EMBED_BATCH, convert_to_numpy=True)
+        result = models.collection.query(query_embeddings=embeddings.tolist(),
+                                         n_results=_worker["top_k"])
+        for i in range(len(texts)):
+            docs = [{"id": d, "text": t, "source": m["source"]} for d, t, m in
+                    zip(result["ids"][i], result["documents"][i], result["metadatas"][i])]
+            out["retrieved_ids"][i] = [d["id"] for d in docs]
+            out["retrieved_sources"][i] = [d["source"] for d in docs]
+            # no sentence embedding here: exact-match dedup keeps the batch fast
+            out["context"][i] = assemble_context(docs)[0]
+
+    return chunk_id, out, time.perf_counter() - t0
+
+
+# ------------------------------------------------------
+# GENERATION STAGE
+# ------------------------------------------------------
+def stub_action(context, text):
+    """Offline stand-in for the LLM: the first retrieved guidance line."""
+    first = next((line for line in context.splitlines() if line.strip()), "")
+    return f"[offline] {first}" if first else "[offline] No guidance retrieved."
+
+
+def get_generator(name):
+    if name == "none":
+        return None
+    if name == "stub":
+        return stub_action
+    if name == "gemini":
+        from combined_server import rag_answer
+
+        return rag_answer
+    raise SystemExit(f"Unknown generator: {name}")
+
+
+async def generate_actions(generator, contexts, texts, concurrency):
+    """Run generator(context, text) for every row with at most `concurrency` in flight."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(context, text):
+        async with sem:
+            return await asyncio.to_thread(generator, context, text)
+
+    return await asyncio.gather(*(one(c, t) for c, t in zip(contexts, texts)))
+
+
+# ------------------------------------------------------
+# OUTPUT + CHECKPOINT
+# ------------------------------------------------------
+def _fingerprint(path, args):
+    st = path.stat()
+    # everything that changes which rows a chunk covers or the part schema
+    return {"input": str(path.resolve()), "size": st.st_size, "mtime": int(st.st_mtime),
+            "chunk_size": args.chunk_size, "top_k": args.top_k, "no_rag": args.no_rag,
+            "generate": args.generate, "keep_context": args.keep_context}
+
+
+def load_checkpoint(out_dir, fingerprint, restart):
+    path = out_dir / CHECKPOINT
+    if restart:
+        for part in out_dir.glob("part-*.parquet"):
+            part.unlink()
+    if restart or not path.exists():
+        return {"fingerprint": fingerprint, "done": []}
+    state = json.loads(path.read_text())
+    if state.get("fingerprint") != fingerprint:
+        raise SystemExit(f"{path} belongs to a different input or settings; use --restart "
+                         f"or another --out")
+    return state
+
+
+def save_checkpoint(out_dir, state):
+    tmp = out_dir / f"{CHECKPOINT}.tmp"
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, out_dir / CHECKPOINT)
+
+
+def write_part(out_dir, chunk_id, df):
+    path = out_dir / f"part-{chunk_id:06d}.parquet"
+    tmp = out_dir / f".part-{chunk_id:06d}.parquet.tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+# ------------------------------------------------------
+# MAIN
+# ------------------------------------------------------
+def run(args):
+    src = Path(args.input)
+    out_dir = Path(args.out or Path("data/bulk") / src.stem)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    state = load_checkpoint(out_dir, _fingerprint(src, args), args.restart)
+    done = set(state["done"])
+    if done:
+        print(f"Resuming: {len(done)} chunks already done")
+
+    generator = get_generator(args.generate)
+    ctx = get_context("spawn")  # fresh interpreters: no forked torch/BLAS thread state
+    pool = ProcessPoolExecutor(args.workers, mp_context=ctx, initializer=_init_worker,
+                               initargs=(args.workers, args.top_k, not args.no_rag))
+
+    chunks = iter_chunks(src, args.chunk_size)
+    pending = {}   # future -> source DataFrame
+    rows = 0
+    t0 = time.perf_counter()
+
+    def submit_next():
+        for chunk_id, df in chunks:
+            if chunk_id in done:
+                continue
+            texts = df[text_column(df)].fillna("").astype(str).tolist()
+            fut = pool.submit(analyze_chunk, chunk_id, chunk_id * args.chunk_size, texts)
+            pending[fut] = df
+            return True
+        return False
+
+    try:
+        # keep the pool busy but bound how many chunks sit in memory
+        while len(pending) < args.workers * 2 and submit_next():
+            pass
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                df = pending.pop(fut)
+                chunk_id, cols, seconds = fut.result()
+                text_col = text_column(df)
+                result = df.reset_index(drop=True).assign(**{k: v for k, v in cols.items()})
+                if generator is not None:
+                    result["recommended_action"] = asyncio.run(generate_actions(
+                        generator, cols["context"], df[text_col].fillna("").astype(str).tolist(),
+                        args.concurrency,
+                    ))
+                if not args.keep_context:
+                    result = result.drop(columns=["context"])
+                write_part(out_dir, chunk_id, result)
+
+                done.add(chunk_id)
+                state["done"] = sorted(done)
+                save_checkpoint(out_dir, state)
+                rows += len(df)
+                rate = rows / (time.perf_counter() - t0)
+                print(f"✓ chunk {chunk_id}: {len(df)} rows (analysis {seconds:.1f}s), "
+                      f"{rate:.0f} rows/s overall")
+                submit_next()
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+    print(f"✓ {rows} rows analyzed into {out_dir} ({len(done)} chunks total)")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk offline analysis of a complaint archive")
+    parser.add_argument("input", help="CSV or JSONL file")
+    parser.add_argument("--out", help="output directory (default data/bulk/<input name>)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=max(1, runtime_config.available_cores() // 2))
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--no-rag", action="store_true", help="classification only")
+    parser.add_argument("--generate", choices=["stub", "gemini", "none"], default="stub")
+    parser.add_argument("--concurrency", type=int, default=4, help="generation calls in flight")
+    parser.add_argument("--keep-context", action="store_true", help="store the assembled context")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if args.no_rag and args.generate != "none":
+        args.generate = "none"
+    try:
+        run(args)
+    except KeyboardInterrupt:
+        print("\nInterrupted; re-run the same command to resume.", file=sys.stderr)
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,46 @@
 # combined_server.py — Simplified version without YOLO
+#
+# Heavy dependencies (torch/sentence_transformers, chromadb, google.generativeai,
+# pandas) are imported on first use, so the port opens immediately. Models load
+# and warm up in the background; GET /ready reports when that is done.
 
 import os
+import json
+import time
+import asyncio
 import uuid
 import shutil
+from datetime import datetime, timezone
 from typing import List
 
-import joblib
-import chromadb
-import google.generativeai as genai
+# Thread budget must be set before numpy/torch load
+import runtime_config
+runtime_config.configure()
+
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
-import pandas as pd
 
 # Import the analytics router
 from analytics_api import router as analytics_router
+from complaint_store import (
+    MAX_STREAM_ROWS, get_store, decode_cursor, parse_bbox, parse_fields, parse_time,
+)
+import metrics
+import profiling
+from responses import CompressionMiddleware, FastJSONResponse, dumps
+from metrics import stage
+from shared_models import models
+from priority_scheduler import PriorityScheduler
+from incident_index import IncidentIndex
+from mongo import mongo
+from write_behind import WriteBehindWriter
+from hotspot_engine import URGENCY_SCORE, HotspotEngine, HotspotSync
+from rag.context import assemble_context, estimate_tokens
 
 # ------------------------------------------------------
 # LOAD ENV + KEYS
@@ -27,13 +49,21 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Only configure the API key if it's available
-if GEMINI_API_KEY and GEMINI_API_KEY != "YOUR_GOOGLE_API_KEY_HERE":
-    genai.configure(api_key=GEMINI_API_KEY)
-    gemini_configured = True
-else:
-    gemini_configured = False
+gemini_configured = bool(GEMINI_API_KEY and GEMINI_API_KEY != "YOUR_GOOGLE_API_KEY_HERE")
+if not gemini_configured:
     print("WARNING: Gemini API key not configured. RAG functionality will be limited.")
 
+_genai = None
+
+def get_genai():
+    """Import and configure google.generativeai on first use."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
+
 # ------------------------------------------------------
 # DIRECTORIES
 # ------------------------------------------------------
@@ -48,14 +78,17 @@ os.makedirs(ANNOTATED_DIR, exist_ok=True)
 # ------------------------------------------------------
 # FASTAPI APP + CORS + STATIC FILES
 # ------------------------------------------------------
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # listing pagination, readable from the browser
 )
 
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
@@ -63,33 +96,59 @@ app.mount("/annotated", StaticFiles(directory=ANNOTATED_DIR), name="annotated")
 
 # Include the analytics router
 app.include_router(analytics_router)
+app.include_router(metrics.router)
+app.include_router(profiling.router)  # /admin/*, only with ADMIN_TOKEN set
 
-# ------------------------------------------------------
-# LOAD ML MODELS (Category + Urgency)
-# ------------------------------------------------------
-vectorizer = joblib.load("models/vectorizer.pkl")
-cat_model = joblib.load("models/category_model.pkl")
-urg_model = joblib.load("models/urgency_model.pkl")
+# Endpoints below live on this router so unified_server.py can mount them too
+router = APIRouter()
 
 # ------------------------------------------------------
-# LOAD RAG COMPONENTS (if available)
+# LOAD ML MODELS (Category + Urgency) + RAG COMPONENTS
 # ------------------------------------------------------
-try:
-    embedder = SentenceTransformer("all-MiniLM-L6-v2")
-    chroma = chromadb.PersistentClient(path="./chroma")
-    collection = chroma.get_collection("hdmc_rag")
-    rag_available = True
-except Exception as e:
-    print(f"WARNING: RAG components not available: {e}")
-    rag_available = False
+# Loaded once per process through shared_models, in a background warm-up
+# task started with the app. Requests that arrive earlier load on demand.
+warm_state = {"ready": False, "seconds": None}
+_warm_task = None
+
+def warm_up():
+    t0 = time.perf_counter()
+    models.warm_up()
+    if gemini_configured:
+        get_genai()
+    warm_state["seconds"] = round(time.perf_counter() - t0, 2)
+    warm_state["ready"] = True
+    print(f"✓ Models warmed up in {warm_state['seconds']}s")
+
+@router.on_event("startup")
+async def start_warm_up():
+    global _warm_task
+    _warm_task = asyncio.get_running_loop().run_in_executor(None, warm_up)
+    writer.start()
+    hotspot_sync.start()
+
+@router.on_event("shutdown")
+async def flush_writer():
+    await hotspot_sync.stop()
+    await writer.stop()
+
+@router.get("/ready")
+def ready():
+    body = {**warm_state, "loaded": models.loaded(), "errors": models.errors}
+    return FastJSONResponse(body, status_code=200 if warm_state["ready"] else 503)
+
+@router.get("/health")
+def health():
+    return {"status": "ok"}
 
 def retrieve_docs(text, top_k=3):
-    if not rag_available:
+    if not models.rag_available:
         return []
         
     try:
-        emb = embedder.encode([text])[0].tolist()
-        result = collection.query(query_embeddings=[emb], n_results=top_k)
+        with stage("embed"):
+            emb = models.embedder.encode([text])[0].tolist()
+        with stage("vector_query"):
+            result = models.collection.query(query_embeddings=[emb], n_results=top_k)
 
         docs = []
         for i in range(len(result["ids"][0])):
@@ -100,15 +159,11 @@ def retrieve_docs(text, top_k=3):
             })
         return docs
     except Exception as e:
-        print(f"Error retrieving docs: {e}")
+        metrics.record_error("retrieve_docs", e)
         return []
 
-def rag_answer(context, query):
-    # If Gemini is not configured, return a default response
-    if not gemini_configured:
-        return "Gemini API not configured. Please set up the GEMINI_API_KEY in the .env file for full RAG functionality.\n\nImmediate Action: Contact local authorities\nResponsible Department: Municipal Corporation\nTime Estimate: 24-48 hours\nShort Explanation: This issue requires attention from the relevant department. Please follow up with local authorities for resolution."
-    
-    prompt = f"""
+def build_prompt(context, query):
+    return f"""
 You are a Hubli–Dharwad Civic Issue Expert.
 
 Use ONLY the context below. If context is insufficient, say:
@@ -127,12 +182,20 @@ Respond with:
 4) Short Explanation  
 """
 
+def rag_answer(context, query):
+    # If Gemini is not configured, return a default response
+    if not gemini_configured:
+        return "Gemini API not configured. Please set up the GEMINI_API_KEY in the .env file for full RAG functionality.\n\nImmediate Action: Contact local authorities\nResponsible Department: Municipal Corporation\nTime Estimate: 24-48 hours\nShort Explanation: This issue requires attention from the relevant department. Please follow up with local authorities for resolution."
+    
+    prompt = build_prompt(context, query)
+
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        resp = model.generate_content(prompt)
+        model = get_genai().GenerativeModel("gemini-2.0-flash")
+        with stage("generate"):
+            resp = model.generate_content(prompt)
         return resp.text.strip()
     except Exception as e:
-        print(f"Error generating RAG response: {e}")
+        metrics.record_error("rag_answer", e)
         return "Unable to generate response at this time. Please try again later."
 
 # ------------------------------------------------------
@@ -141,31 +204,123 @@ Respond with:
 class TextRequest(BaseModel):
     text: str
     top_k: int = 3
+    lat: float | None = None
+    lng: float | None = None
+    area: str | None = None
+
+# Urgency-ordered admission to the RAG/LLM stage (see priority_scheduler.py)
+scheduler = PriorityScheduler()
+
+# Repeat reports of the same issue reuse the first report's analysis. The index
+# lives in this worker's memory: with several workers, a repeat that lands on
+# another worker starts a new incident there.
+incidents = IncidentIndex()
+
+# Analyzed complaints are persisted in batches off the request path
+writer = WriteBehindWriter(get_store)
+mongo.on_close(writer.stop)  # flush before the Mongo client goes away
+
+# Windowed hotspots, fed from the store so every worker sees every report
+hotspot_engine = HotspotEngine()
+hotspot_sync = HotspotSync(hotspot_engine, get_store)
+
+async def record_complaint(data, result, incident_id=None, duplicate=False):
+    await writer.put({
+        "ts": time.time(),  # report time, not flush time, so windows stay exact
+        "text": data.text,
+        "category": result.get("category"),
+        "urgency": result.get("urgency"),
+        "action": result.get("recommended_action"),
+        "area": data.area,
+        "lat": data.lat,
+        "lng": data.lng,
+        # repeats keep the incident's id; hotspots and rollups count them once
+        "incident_id": incident_id,
+        "duplicate": duplicate,
+    })
+
+def classify(text):
+    with stage("vectorize"):
+        X = models.vectorizer.transform([text])
+    with stage("classify"):
+        return models.cat_model.predict(X)[0], models.urg_model.predict(X)[0]
+
+def rag_stage(text, top_k):
+    docs = retrieve_docs(text, top_k)
+    # merge overlapping chunks, drop redundant sentences, cap at the token budget
+    embedder = models.embedder if models.rag_available else None
+    with stage("context"):
+        context, stats = assemble_context(docs, embedder=embedder)
+    stats["prompt_tokens"] = estimate_tokens(build_prompt(context, text))
+    return docs, rag_answer(context, text), stats
+
+def retrieval_only_stage(text, top_k):
+    """Degraded answer under load: the retrieved guidance without an LLM call."""
+    docs = retrieve_docs(text, top_k)
+    if not docs:
+        return docs, "High load: detailed recommendation deferred. Please contact the HDMC helpline.", {"prompt_tokens": 0}
+    context, stats = assemble_context(docs, with_sources=True)
+    stats["prompt_tokens"] = 0
+    answer = "High load: showing the most relevant official guidance instead of a generated answer.\n\n" + context
+    return docs, answer, stats
+
+@router.post("/analyze")
+async def analyze(data: TextRequest):
+    with stage("dedup"):
+        incident, signature = incidents.find(data.text, data.lat, data.lng, data.area)
+    metrics.cache_result("incidents", incident is not None)
+    if incident is not None:
+        incidents.attach(incident)
+        await record_complaint(data, incident.analysis, incident.id, duplicate=True)
+        return FastJSONResponse({
+            **incident.analysis,
+            "incident_id": incident.id,
+            "incident_reports": incident.reports,
+            "duplicate": True,
+        })
 
-@app.post("/analyze")
-def analyze(data: TextRequest):
-    X = vectorizer.transform([data.text])
-    category = cat_model.predict(X)[0]
-    urgency = urg_model.predict(X)[0]
+    category, urgency = await run_in_threadpool(classify, data.text)
 
-    docs = retrieve_docs(data.text, data.top_k)
-    context = "\n\n".join([d["text"] for d in docs])
-    action = rag_answer(context, data.text)
+    (docs, action, context_stats), degraded = await scheduler.run(
+        urgency, rag_stage, data.text, data.top_k, degrade=retrieval_only_stage
+    )
 
-    return {
+    result = {
         "category": category,
         "urgency": urgency,
         "recommended_action": action,
-        "retrieved": docs
+        "retrieved": docs,
+        "degraded": degraded,
+        "prompt_tokens": context_stats["prompt_tokens"],
+        "context": context_stats,
     }
+    # degraded answers are not worth reusing for later reports
+    incident = None if degraded else incidents.add(
+        signature, data.text, result, data.lat, data.lng, data.area
+    )
+    await record_complaint(data, result, incident.id if incident else None)
+    # FastJSONResponse directly: skips jsonable_encoder over the retrieved chunk texts
+    return FastJSONResponse({
+        **result,
+        "incident_id": incident.id if incident else None,
+        "incident_reports": 1,
+        "duplicate": False,
+    })
+
+@router.get("/analyze/queue")
+def analyze_queue():
+    return {**scheduler.stats(), "writer": writer.stats()}
+
+@router.get("/incidents")
+def list_incidents(min_reports: int = 1, limit: int = 500):
+    """Active incidents (deduplicated complaints), most reported first."""
+    return {"incidents": incidents.incidents(min_reports, limit), **incidents.stats()}
 
-# --- Add /hotspots endpoint to combined_server.py ---
-
-# helper to convert urgency label to numeric score
-URGENCY_SCORE = {"Low": 1, "Medium": 2, "High": 3}
-
-@app.get("/hotspots")
-def hotspots():
+# ------------------------------------------------------
+# HOTSPOTS
+# ------------------------------------------------------
+@router.get("/hotspots")
+async def hotspots(window: str | None = None, limit: int | None = None):
     """
     Returns JSON with aggregated hotspots:
     [
@@ -176,11 +331,31 @@ def hotspots():
         "count": 12,
         "avg_urgency_score": 1.83,
         "avg_urgency_label": "Medium",
+        "score": 9.41,
+        "last_seen": 1760860800.0,
         "sample_text": "A big pothole near Gokul Road Market..."
       },
       ...
     ]
+
+    window: 1h-48h or 1d-31d back from now, ranked by time-decayed score
+    (served from hotspot_engine). window=all aggregates the whole complaints
+    CSV, as this endpoint used to. Without a window: 30d once the complaint
+    store has rows, else all (a fresh install has only the CSV).
     """
+    if window is None:
+        window = "30d" if hotspot_sync.store_has_rows else "all"
+    if window == "all":
+        return await run_in_threadpool(csv_hotspots)
+    try:
+        # on the event loop, like the sync task that mutates the engine
+        rows = hotspot_engine.hotspots(window, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"hotspots": rows, "window": window, **hotspot_engine.stats()}
+
+def csv_hotspots():
+    """All-time hotspots aggregated from the complaints CSV."""
     # path to your CSV (update if different)
     csv_candidates = [
         "data/complaints_hdmc.csv",        # earlier suggestions
@@ -197,6 +372,9 @@ def hotspots():
     if csv_path is None:
         raise HTTPException(status_code=500, detail="complaints CSV not found. Place at data/complaints.csv or similar.")
 
+    import numpy as np
+    import pandas as pd
+
     df = pd.read_csv(csv_path)
 
     # ensure columns exist
@@ -212,176 +390,184 @@ def hotspots():
     df["lat_rounded"] = df["Latitude"].round(5)   # adjust precision if needed
     df["lng_rounded"] = df["Longitude"].round(5)
 
+    df["urgency_score"] = df["Urgency"].map(URGENCY_SCORE).fillna(1)
+
     grouped = df.groupby(["Area", "lat_rounded", "lng_rounded"]).agg(
         count = ("ComplaintText", "count"),
-        avg_urgency_score = ("Urgency", lambda s: sum(URGENCY_SCORE.get(x,1) for x in s) / len(s)),
-        sample_text = ("ComplaintText", lambda s: s.iloc[0])
+        avg_urgency_score = ("urgency_score", "mean"),
+        sample_text = ("ComplaintText", "first")
     ).reset_index()
 
     # map numeric avg back to label
-    def score_to_label(score):
-        if score >= 2.5: return "High"
-        if score >= 1.5: return "Medium"
-        return "Low"
-
-    hotspots = []
-    for _, r in grouped.iterrows():
-        hotspots.append({
-            "area": r["Area"],
-            "lat": float(r["lat_rounded"]),
-            "lng": float(r["lng_rounded"]),
-            "count": int(r["count"]),
-            "avg_urgency_score": float(round(float(r["avg_urgency_score"]), 2)),
-            "avg_urgency_label": score_to_label(r["avg_urgency_score"]),
-            "sample_text": str(r["sample_text"])
-        })
+    score = grouped["avg_urgency_score"]
+    grouped["avg_urgency_label"] = np.select([score >= 2.5, score >= 1.5], ["High", "Medium"], "Low")
+    grouped["avg_urgency_score"] = score.round(2)
+    grouped["sample_text"] = grouped["sample_text"].astype(str)
 
-    # additionally compute city bounds or summary if you want
-    return {"hotspots": hotspots}
-
-# ------------------------------------------------------
-# ADD MAP DATA ENDPOINT
-# ------------------------------------------------------
-
-@app.get("/complaints/map")
-def complaints_map():
-    # For now, we'll return mock data
-    # In a full implementation, this would query your database
-    mock_complaints = [
-        {
-            "longitude": 75.1239,
-            "latitude": 15.3647,
-            "category": "Pothole",
-            "urgency": "High",
-            "area": "Hubli Central",
-            "text": "Large pothole causing traffic issues"
-        },
-        {
-            "longitude": 75.1339,
-            "latitude": 15.3547,
-            "category": "Garbage",
-            "urgency": "Medium",
-            "area": "Dharwad East",
-            "text": "Garbage collection needed"
-        },
-        {
-            "longitude": 75.1139,
-            "latitude": 15.3747,
-            "category": "Drainage",
-            "urgency": "High",
-            "area": "Hubli West",
-            "text": "Waterlogging after rains"
-        },
-        {
-            "longitude": 75.1439,
-            "latitude": 15.3847,
-            "category": "Electricity",
-            "urgency": "Medium",
-            "area": "Dharwad Central",
-            "text": "Street light not working"
-        },
-        {
-            "longitude": 75.1039,
-            "latitude": 15.3947,
-            "category": "Pothole",
-            "urgency": "Low",
-            "area": "Unkal Lake",
-            "text": "Small crack in road"
-        }
+    hotspots = grouped.rename(columns={"Area": "area", "lat_rounded": "lat", "lng_rounded": "lng"})[
+        ["area", "lat", "lng", "count", "avg_urgency_score", "avg_urgency_label", "sample_text"]
     ]
-    return {"data": mock_complaints}
 
-# ------------------------------------------------------
-# ADD MAP ENDPOINT FOR ISSUE LISTING
-# ------------------------------------------------------
-
-@app.get("/list-issues")
-def list_issues():
-    # For now, we'll return mock data since we don't have MongoDB integration yet
-    # In a full implementation, this would query your MongoDB collection
-    mock_issues = [
-        {
-            "lat": 15.3647,
-            "lng": 75.1239,
-            "category": "pothole",
-            "urgency": "High",
-            "area": "Hubli Central",
-            "image": None
-        },
-        {
-            "lat": 15.3547,
-            "lng": 75.1339,
-            "category": "garbage",
-            "urgency": "Medium",
-            "area": "Dharwad East",
-            "image": None
-        },
-        {
-            "lat": 15.3747,
-            "lng": 75.1139,
-            "category": "drainage",
-            "urgency": "High",
-            "area": "Hubli West",
-            "image": None
-        },
-        {
-            "lat": 15.3847,
-            "lng": 75.1439,
-            "category": "hazard",
-            "urgency": "Critical",
-            "area": "Dharwad Central",
-            "image": None
-        }
-    ]
-    return mock_issues
+    # serialized straight from the DataFrame, no per-row Python dicts
+    return FastJSONResponse({"hotspots": hotspots, "window": "all"})
 
 # ------------------------------------------------------
-# ADD HISTORY ENDPOINT FOR YOLO DETECTIONS
+# COMPLAINT LISTINGS (map, issues, history)
 # ------------------------------------------------------
+# Served from complaint_store with keyset pagination: pass the returned
+# cursor back as ?cursor= to fetch the next page. ?fields= projects columns,
+# ?bbox=min_lng,min_lat,max_lng,max_lat and ?since=/?until= filter, and
+# ?format=ndjson streams rows instead of returning one JSON page.
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# output field -> (store column, converter)
+MAP_FIELDS = {
+    "id": ("id", str),
+    "longitude": ("lng", None),
+    "latitude": ("lat", None),
+    "category": ("category", None),
+    "urgency": ("urgency", None),
+    "area": ("area", None),
+    "text": ("text", None),
+}
+ISSUE_FIELDS = {
+    "lat": ("lat", None),
+    "lng": ("lng", None),
+    "category": ("category", None),
+    "urgency": ("urgency", None),
+    "area": ("area", None),
+    "image": ("image", None),
+}
+HISTORY_FIELDS = {
+    "id": ("id", str),
+    "timestamp": ("ts", _iso),
+    "category": ("category", None),
+    "urgency": ("urgency", None),
+    "area": ("area", None),
+    "lat": ("lat", None),
+    "lng": ("lng", None),
+    "image": ("image", None),
+    "yolo_boxes": ("yolo_boxes", None),
+}
+
+_END = object()
+
+async def _complaint_listing(mapping, fields, limit, format, cursor, bbox,
+                             since, until, category, urgency, envelope=None):
+    try:
+        filters = dict(
+            after=decode_cursor(cursor),
+            bbox=parse_bbox(bbox),
+            since=parse_time(since),
+            until=parse_time(until),
+            category=category,
+            urgency=urgency,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    out_fields = parse_fields(fields, mapping)
+    store_fields = list({mapping[f][0] for f in out_fields})
+
+    def shape(row):
+        out = {}
+        for f in out_fields:
+            col, conv = mapping[f]
+            v = row[col]
+            out[f] = conv(v) if conv and v is not None else v
+        return out
+
+    store = get_store()
+
+    if format == "ndjson":
+        rows = store.iter_rows(store_fields, limit=limit or MAX_STREAM_ROWS, **filters)
+        # Pull the first row before committing to a 200: store errors (Mongo
+        # down, bad cursor) surface on first iteration, after headers are sent.
+        try:
+            if hasattr(rows, "__aiter__"):
+                first = await anext(rows, _END)
+            else:
+                first = await run_in_threadpool(next, rows, _END)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+        if hasattr(rows, "__aiter__"):
+            async def lines():
+                if first is not _END:
+                    yield dumps(shape(first)) + b"\n"
+                async for r in rows:
+                    yield dumps(shape(r)) + b"\n"
+        else:
+            def lines():
+                if first is not _END:
+                    yield dumps(shape(first)) + b"\n"
+                for r in rows:
+                    yield dumps(shape(r)) + b"\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
 
-@app.get("/history")
-def history():
-    # For now, we'll return mock data since we don't have MongoDB integration yet
-    # In a full implementation, this would query your MongoDB collection
-    mock_entries = [
-        {
-            "id": "1",
-            "timestamp": "2025-11-17T10:30:00Z",
-            "category": "pothole",
-            "urgency": "High",
-            "area": "Hubli Central",
-            "lat": 15.3647,
-            "lng": 75.1239,
-            "image": None,
-            "yolo_boxes": [
-                {"x": 100, "y": 150, "width": 50, "height": 50, "class": "pothole", "confidence": 0.95}
-            ],
-        },
-        {
-            "id": "2",
-            "timestamp": "2025-11-17T09:15:00Z",
-            "category": "garbage",
-            "urgency": "Medium",
-            "area": "Dharwad East",
-            "lat": 15.3547,
-            "lng": 75.1339,
-            "image": None,
-            "yolo_boxes": [
-                {"x": 200, "y": 300, "width": 75, "height": 75, "class": "garbage", "confidence": 0.87}
-            ],
-        },
-        {
-            "id": "3",
-            "timestamp": "2025-11-16T14:45:00Z",
-            "category": "drainage",
-            "urgency": "High",
-            "area": "Hubli West",
-            "lat": 15.3747,
-            "lng": 75.1139,
-            "image": None,
-            "yolo_boxes": [
-                {"x": 150, "y": 200, "width": 60, "height": 60, "class": "drainage", "confidence": 0.92}
-            ],
-        }
-    ]
-    return mock_entries
\ No newline at end of file
+    try:
+        rows, next_cursor = await store.page(store_fields, limit or 100, **filters)
+    except ValueError as e:  # cursor id of the wrong type for this store
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    items = [shape(r) for r in rows]
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    body = envelope(items, next_cursor) if envelope else items
+    return FastJSONResponse(body, headers=headers)
+
+@router.get("/complaints/map")
+async def complaints_map(
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    bbox: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    urgency: str | None = None,
+    format: str = "json",
+):
+    return await _complaint_listing(
+        MAP_FIELDS, fields, limit, format, cursor, bbox, since, until, category, urgency,
+        envelope=lambda items, nxt: {"data": items, "next_cursor": nxt},
+    )
+
+@router.get("/list-issues")
+async def list_issues(
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    bbox: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    urgency: str | None = None,
+    format: str = "json",
+):
+    return await _complaint_listing(
+        ISSUE_FIELDS, fields, limit, format, cursor, bbox, since, until, category, urgency,
+    )
+
+@router.get("/history")
+async def history(
+    cursor: str | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    bbox: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    category: str | None = None,
+    urgency: str | None = None,
+    format: str = "json",
+):
+    return await _complaint_listing(
+        HISTORY_FIELDS, fields, limit, format, cursor, bbox, since, until, category, urgency,
+    )
+
+app.include_router(router)
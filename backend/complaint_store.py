@@ -0,0 +1,466 @@
+# complaint_store.py — persistent complaint storage for the list/map/history endpoints
+#
+# SQLite (default, file under data/) or MongoDB (COMPLAINT_STORE=mongo).
+# All reads use keyset pagination on (ts, id), newest first, so paging deep
+# into hundreds of thousands of rows costs the same as the first page.
+#
+# Import the sample CSV into the local store:
+#   python complaint_store.py --import data/complaints_hdmc.csv
+
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+STORE_BACKEND = os.getenv("COMPLAINT_STORE", "sqlite")
+SQLITE_PATH = os.getenv("COMPLAINT_DB", "data/complaints.db")
+
+MAX_PAGE_SIZE = 1000
+MAX_STREAM_ROWS = 500_000
+STREAM_BATCH = 500
+
+# Columns a client may project; anything else is ignored.
+FIELDS = [
+    "id", "ts", "date", "text", "category", "urgency",
+    "area", "lat", "lng", "image", "yolo_boxes", "action", "incident_id", "duplicate",
+    "committed_at",
+]
+JSON_FIELDS = {"yolo_boxes"}
+
+
+# ------------------------------------------------------
+# CURSORS + FILTER PARSING
+# ------------------------------------------------------
+def encode_cursor(ts, id_):
+    raw = json.dumps([ts, id_], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        ts, id_ = json.loads(base64.urlsafe_b64decode(cursor + pad))
+        ts = float(ts)
+    except Exception:
+        raise ValueError("invalid cursor")
+    # SQLite ids are ints, Mongo ids 24-char hex strings; each store re-checks its own
+    if isinstance(id_, bool) or not isinstance(id_, (int, str)):
+        raise ValueError("invalid cursor")
+    return ts, id_
+
+
+def parse_bbox(bbox):
+    """'min_lng,min_lat,max_lng,max_lat' -> tuple of floats, or None."""
+    if not bbox:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(x) for x in bbox.split(","))
+    except Exception:
+        raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def parse_time(value):
+    """Accept epoch seconds or an ISO-8601 date/datetime; return epoch seconds."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"invalid time: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def parse_fields(fields, allowed):
+    """Comma-separated projection -> list of allowed names (all if empty)."""
+    if not fields:
+        return list(allowed)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    return [f for f in wanted if f in allowed] or list(allowed)
+
+
+def normalize(doc):
+    """Fill ts/date defaults for a complaint about to be stored."""
+    doc = {k: v for k, v in doc.items() if k in FIELDS and k != "id"}
+    ts = doc.get("ts")
+    if ts is None:
+        ts = time.time()
+    doc["ts"] = float(ts)
+    doc.setdefault("date", datetime.fromtimestamp(doc["ts"], timezone.utc).strftime("%Y-%m-%d"))
+    return doc
+
+
+# ------------------------------------------------------
+# SQLITE STORE
+# ------------------------------------------------------
+class SQLiteComplaintStore:
+    """SQLite store; one connection per thread, WAL mode for concurrent readers."""
+
+    # Longest a batch can sit between being stamped with committed_at and
+    # becoming visible: waiting for the write lock (sqlite3's 5 s busy
+    # default timeout, after which the insert fails instead).
+    COMMIT_SKEW_S = 10.0
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._init_schema()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS complaints (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                date TEXT,
+                text TEXT,
+                category TEXT,
+                urgency TEXT,
+                area TEXT,
+                lat REAL,
+                lng REAL,
+                image TEXT,
+                yolo_boxes TEXT,
+                action TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_complaints_ts ON complaints (ts DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_complaints_geo ON complaints (lat, lng, ts);
+            CREATE INDEX IF NOT EXISTS idx_complaints_category ON complaints (category, ts DESC, id DESC);
+        """)
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(complaints)")}
+        with conn:  # stores created before these columns existed
+            for name, kind in (("incident_id", "TEXT"), ("duplicate", "INTEGER")):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE complaints ADD COLUMN {name} {kind}")
+            if "committed_at" not in columns:
+                conn.execute("ALTER TABLE complaints ADD COLUMN committed_at REAL")
+                conn.execute("UPDATE complaints SET committed_at = ts")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_complaints_committed ON complaints (committed_at, id)")
+        conn.commit()
+
+    # --- writes ---
+    def _add_many_sync(self, docs):
+        docs = [normalize(d) for d in docs]
+        committed_at = time.time()
+        for d in docs:
+            d["committed_at"] = committed_at
+        cols = [c for c in FIELDS if c != "id"]
+        rows = [
+            tuple(json.dumps(d.get(c)) if c in JSON_FIELDS and d.get(c) is not None else d.get(c)
+                  for c in cols)
+            for d in docs
+        ]
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                f"INSERT INTO complaints ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})",
+                rows,
+            )
+        return len(rows)
+
+    async def add_many(self, docs):
+        return await asyncio.to_thread(self._add_many_sync, list(docs))
+
+    async def add(self, doc):
+        return await self.add_many([doc])
+
+    # --- reads ---
+    def _where(self, bbox, since, until, category, urgency, after):
+        clauses, params = [], []
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            clauses.append("lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?")
+            params += [min_lat, max_lat, min_lng, max_lng]
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if urgency:
+            clauses.append("urgency = ?")
+            params.append(urgency)
+        if after:
+            ts, id_ = after
+            if isinstance(id_, bool) or not isinstance(id_, int):
+                raise ValueError("invalid cursor")
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params += [ts, ts, id_]
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        return where, params
+
+    def _row(self, row, fields):
+        out = {}
+        for f in fields:
+            v = row[f]
+            if f in JSON_FIELDS and v is not None:
+                v = json.loads(v)
+            out[f] = v
+        return out
+
+    def _query(self, fields, limit, bbox=None, since=None, until=None,
+               category=None, urgency=None, after=None):
+        cols = sorted(set(fields) | {"id", "ts"}, key=FIELDS.index)
+        where, params = self._where(bbox, since, until, category, urgency, after)
+        sql = (f"SELECT {','.join(cols)} FROM complaints {where} "
+               f"ORDER BY ts DESC, id DESC LIMIT ?")
+        return self._conn().execute(sql, params + [limit])
+
+    def _page_sync(self, fields, limit, **filters):
+        rows = self._query(fields, limit + 1, **filters).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["ts"], last["id"])
+        return [self._row(r, fields) for r in rows], next_cursor
+
+    async def page(self, fields, limit=100, **filters):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return await asyncio.to_thread(self._page_sync, fields, limit, **filters)
+
+    def _changes_sync(self, fields, since, after, limit):
+        cols = sorted(set(fields) | {"id", "committed_at"}, key=FIELDS.index)
+        if after:
+            where, params = "committed_at > ? OR (committed_at = ? AND id > ?)", [after[0], after[0], after[1]]
+        else:
+            where, params = "committed_at >= ?", [since or 0]
+        rows = self._conn().execute(
+            f"SELECT {','.join(cols)} FROM complaints WHERE {where} "
+            f"ORDER BY committed_at, id LIMIT ?", params + [limit + 1],
+        ).fetchall()
+        more = len(rows) > limit
+        rows = [self._row(r, cols) for r in rows[:limit]]
+        return rows, ((rows[-1]["committed_at"], rows[-1]["id"]) if more else None)
+
+    async def changes(self, fields, since=None, after=None, limit=MAX_PAGE_SIZE):
+        """Rows in commit order (oldest first) committed at or after `since`.
+
+        Returns (rows, after); pass `after` back for the next page, None when
+        done. Each row carries committed_at.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        return await asyncio.to_thread(self._changes_sync, fields, since, after, limit)
+
+    def iter_rows(self, fields, limit=MAX_STREAM_ROWS, **filters):
+        """Yield rows in batches without materialising the result set."""
+        # use a dedicated connection: the generator may be resumed on any thread
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cols = sorted(set(fields) | {"id", "ts"}, key=FIELDS.index)
+            where, params = self._where(
+                filters.get("bbox"), filters.get("since"), filters.get("until"),
+                filters.get("category"), filters.get("urgency"), filters.get("after"),
+            )
+            cur = conn.execute(
+                f"SELECT {','.join(cols)} FROM complaints {where} "
+                f"ORDER BY ts DESC, id DESC LIMIT ?",
+                params + [min(limit, MAX_STREAM_ROWS)],
+            )
+            while True:
+                batch = cur.fetchmany(STREAM_BATCH)
+                if not batch:
+                    break
+                for r in batch:
+                    yield self._row(r, fields)
+        finally:
+            conn.close()
+
+
+# ------------------------------------------------------
+# MONGO STORE
+# ------------------------------------------------------
+class MongoComplaintStore:
+    """Same interface on top of civic_db.complaints; writes also update rollups."""
+
+    # Longest insert_many can take after the committed_at stamp before it
+    # fails: server selection (2 s) + socket timeout (10 s), see mongo.py.
+    COMMIT_SKEW_S = 30.0
+
+    def __init__(self):
+        from mongo import mongo
+
+        self.mongo = mongo
+        self.mongo.on_connect(self._ensure_indexes)
+
+    async def _ensure_indexes(self, db):
+        col = db["complaints"]
+        await col.create_index([("ts", -1), ("_id", -1)])
+        await col.create_index([("lat", 1), ("lng", 1), ("ts", -1)])
+        await col.create_index([("category", 1), ("ts", -1), ("_id", -1)])
+        await col.create_index([("committed_at", 1), ("_id", 1)])
+        # documents written before the changes feed existed
+        await col.update_many({"committed_at": {"$exists": False}}, [{"$set": {"committed_at": "$ts"}}])
+
+    def _db(self):
+        db = self.mongo.get_db()
+        if db is None:
+            raise RuntimeError("MongoDB not available")
+        return db
+
+    async def add_many(self, docs):
+        import rollups
+
+        docs = [normalize(d) for d in docs]
+        if not docs:
+            return 0
+        db = self._db()
+        committed_at = time.time()
+        for d in docs:
+            d["committed_at"] = committed_at
+        await db["complaints"].insert_many(docs, ordered=False)
+        await rollups.record_complaints(db, docs)
+        return len(docs)
+
+    async def add(self, doc):
+        return await self.add_many([doc])
+
+    def _filter(self, bbox=None, since=None, until=None, category=None,
+                urgency=None, after=None):
+        from bson import ObjectId
+
+        q = {}
+        if bbox:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            q["lat"] = {"$gte": min_lat, "$lte": max_lat}
+            q["lng"] = {"$gte": min_lng, "$lte": max_lng}
+        if since is not None or until is not None:
+            q["ts"] = {}
+            if since is not None:
+                q["ts"]["$gte"] = since
+            if until is not None:
+                q["ts"]["$lt"] = until
+        if category:
+            q["category"] = category
+        if urgency:
+            q["urgency"] = urgency
+        if after:
+            ts, id_ = after
+            if not isinstance(id_, str) or not ObjectId.is_valid(id_):
+                raise ValueError("invalid cursor")
+            q = {"$and": [q, {"$or": [
+                {"ts": {"$lt": ts}},
+                {"ts": ts, "_id": {"$lt": ObjectId(id_)}},
+            ]}]}
+        return q
+
+    def _row(self, doc, fields):
+        return {f: (str(doc["_id"]) if f == "id" else doc.get(f)) for f in fields}
+
+    def _find(self, fields, limit, **filters):
+        projection = {f: 1 for f in fields if f != "id"}
+        projection["ts"] = 1
+        return (self._db()["complaints"]
+                .find(self._filter(**filters), projection)
+                .sort([("ts", -1), ("_id", -1)])
+                .limit(limit))
+
+    async def page(self, fields, limit=100, **filters):
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        docs = await self._find(fields, limit + 1, **filters).to_list(limit + 1)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1]["ts"], str(docs[-1]["_id"]))
+        return [self._row(d, fields) for d in docs], next_cursor
+
+    async def changes(self, fields, since=None, after=None, limit=MAX_PAGE_SIZE):
+        """Rows in commit order (oldest first); see SQLiteComplaintStore.changes."""
+        from bson import ObjectId
+
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        if after:
+            ts, id_ = after[0], ObjectId(after[1])
+            q = {"$or": [{"committed_at": {"$gt": ts}}, {"committed_at": ts, "_id": {"$gt": id_}}]}
+        else:
+            q = {"committed_at": {"$gte": since or 0}}
+        projection = {f: 1 for f in fields if f != "id"}
+        projection["committed_at"] = 1
+        docs = await (self._db()["complaints"].find(q, projection)
+                      .sort([("committed_at", 1), ("_id", 1)])
+                      .limit(limit + 1).to_list(limit + 1))
+        more = len(docs) > limit
+        out = list(dict.fromkeys([*fields, "id", "committed_at"]))
+        rows = [self._row(d, out) for d in docs[:limit]]
+        return rows, ((rows[-1]["committed_at"], rows[-1]["id"]) if more else None)
+
+    async def iter_rows(self, fields, limit=MAX_STREAM_ROWS, **filters):
+        cursor = self._find(fields, min(limit, MAX_STREAM_ROWS), **filters).batch_size(STREAM_BATCH)
+        async for doc in cursor:
+            yield self._row(doc, fields)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = MongoComplaintStore() if STORE_BACKEND == "mongo" else SQLiteComplaintStore()
+    return _store
+
+
+def import_csv(path, store=None):
+    """Load a complaints CSV (ComplaintText, Category, Urgency, Area, Latitude, Longitude)."""
+    import csv
+
+    store = store or SQLiteComplaintStore()
+    now = time.time()
+    batch, total = [], 0
+    with open(path, newline="", encoding="utf8") as f:
+        for i, r in enumerate(csv.DictReader(f)):
+            try:
+                lat, lng = float(r["Latitude"]), float(r["Longitude"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            batch.append({
+                "ts": now - i,  # keep CSV order stable, newest first
+                "text": r.get("ComplaintText"),
+                "category": r.get("Category"),
+                "urgency": r.get("Urgency"),
+                "area": r.get("Area"),
+                "lat": lat,
+                "lng": lng,
+            })
+            if len(batch) >= 5000:
+                total += store._add_many_sync(batch)
+                batch = []
+    if batch:
+        total += store._add_many_sync(batch)
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "--import":
+        print("Usage: python complaint_store.py --import <complaints.csv>")
+        sys.exit(1)
+    n = import_csv(sys.argv[2])
+    print(f"✓ Imported {n} complaints into {SQLITE_PATH}")
@@ -0,0 +1,148 @@
+# detection_cache.py — reuse detections for repeated / near-identical uploads
+#
+# Two lookups, both persisted in SQLite so they survive restarts:
+#   * exact: sha256 of the uploaded bytes
+#   * near:  64-bit dHash of the decoded image, matched by Hamming distance.
+#            The hash is split into 8 bytes, each indexed; any hash within
+#            distance 7 shares at least one byte with the query, so the
+#            indexed candidates are a superset of the true matches.
+# Boxes are stored relative to image size so a hit can be mapped onto a
+# re-encoded or resized copy of the same photo.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from PIL import Image
+
+CACHE_PATH = os.getenv("DETECTION_CACHE_DB", "data/detection_cache.db")
+MAX_ENTRIES = int(os.getenv("DETECTION_CACHE_SIZE", "20000"))
+HAMMING_THRESHOLD = int(os.getenv("DETECTION_HAMMING_THRESHOLD", "5"))
+BANDS = 8
+
+
+def dhash(image, size=8):
+    """Difference hash: compare adjacent pixels of a (size+1) x size grayscale thumbnail."""
+    small = image.convert("L").resize((size + 1, size), Image.BILINEAR)
+    px = small.tobytes()
+    h = 0
+    for row in range(size):
+        base = row * (size + 1)
+        for col in range(size):
+            h = (h << 1) | (px[base + col] > px[base + col + 1])
+    return h
+
+
+def _bands(h):
+    return [(h >> (8 * i)) & 0xFF for i in range(BANDS)]
+
+
+def normalize_boxes(predictions, width, height):
+    out = []
+    for p in predictions:
+        p = dict(p)
+        for k, s in (("x", width), ("width", width), ("y", height), ("height", height)):
+            if k in p:
+                p[k] = p[k] / s
+        p.pop("points", None)
+        out.append(p)
+    return out
+
+
+def denormalize_boxes(predictions, width, height):
+    out = []
+    for p in predictions:
+        p = dict(p)
+        for k, s in (("x", width), ("width", width), ("y", height), ("height", height)):
+            if k in p:
+                p[k] = p[k] * s
+        out.append(p)
+    return out
+
+
+class DetectionCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, threshold=HAMMING_THRESHOLD):
+        self.path = path
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.hits = {"exact": 0, "near": 0, "miss": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS detections (
+                sha256 TEXT PRIMARY KEY,
+                dhash TEXT NOT NULL,
+                {", ".join(f"b{i} INTEGER" for i in range(BANDS))},
+                boxes TEXT NOT NULL,
+                created REAL,
+                last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_det_last_used ON detections (last_used);
+            {" ".join(f"CREATE INDEX IF NOT EXISTS idx_det_b{i} ON detections (b{i});" for i in range(BANDS))}
+        """)
+        self._conn.commit()
+
+    def get_exact(self, sha256):
+        """Return normalized boxes for an identical upload, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT boxes FROM detections WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(sha256)
+        self.hits["exact"] += 1
+        return json.loads(row[0])
+
+    def get_near(self, h):
+        """Return (sha256, distance, normalized boxes) of the closest near-duplicate, or None."""
+        bands = _bands(h)
+        where = " OR ".join(f"b{i} = ?" for i in range(BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT sha256, dhash, boxes FROM detections WHERE {where}", bands
+            ).fetchall()
+            best = None
+            for sha, other, boxes in rows:
+                d = bin(h ^ int(other, 16)).count("1")
+                if d <= self.threshold and (best is None or d < best[1]):
+                    best = (sha, d, boxes)
+            if best is None:
+                self.hits["miss"] += 1
+                return None
+            self._touch(best[0])
+        self.hits["near"] += 1
+        return best[0], best[1], json.loads(best[2])
+
+    def put(self, sha256, h, boxes):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO detections VALUES (?, ?, {', '.join('?' * BANDS)}, ?, ?, ?)",
+                [sha256, f"{h:016x}", *_bands(h), json.dumps(boxes), now, now],
+            )
+            self._evict()
+
+    def _touch(self, sha256):
+        with self._conn:
+            self._conn.execute(
+                "UPDATE detections SET last_used = ? WHERE sha256 = ?", (time.time(), sha256)
+            )
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()
+        if count > self.max_entries:
+            # drop the least recently used 10% in one statement
+            self._conn.execute(
+                "DELETE FROM detections WHERE sha256 IN "
+                "(SELECT sha256 FROM detections ORDER BY last_used LIMIT ?)",
+                (count - int(self.max_entries * 0.9),),
+            )
+
+    def stats(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()
+        return {"entries": count, "max_entries": self.max_entries, **self.hits}
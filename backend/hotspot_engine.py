@@ -0,0 +1,260 @@
+# hotspot_engine.py — sliding-window, time-decayed hotspot aggregation
+#
+# Complaints are bucketed per map cell (lat/lng rounded to HOTSPOT_CELL_PRECISION
+# decimals, the same grid /hotspots has always used) into two ring buffers:
+# HOURLY_SLOTS one-hour buckets and DAILY_SLOTS one-day buckets. Each slot
+# remembers which hour/day it holds, so stale slots are simply ignored and
+# overwritten - nothing is ever shifted or rescanned. Every cell also keeps an
+# exponentially decayed score (half-life HOTSPOT_HALF_LIFE_H) weighted by
+# urgency, so a cluster of fresh High reports outranks an old pile of Lows.
+#
+# A "last 24h / 7d / 30d" query touches each active cell once, and cells with
+# no report inside the longest window are dropped, so memory is bounded by
+# active cells x (HOURLY_SLOTS + DAILY_SLOTS), not by the number of complaints.
+#
+# Each worker process keeps its own engine and fills it from the complaint
+# store (HotspotSync), so all workers converge on the same view within
+# HOTSPOT_SYNC_S seconds regardless of which one handled a report. The sync
+# follows the store's commit order (committed_at, stamped when a batch is
+# written), not the report time, so a report that sat in the write-behind
+# queue for minutes is still picked up; it is re-read from the store's
+# COMMIT_SKEW_S bound back to cover batches stamped earlier but committed later.
+# Repeat reports of an incident (duplicate=True) are skipped, so counts are
+# distinct incidents.
+
+import asyncio
+import math
+import os
+import re
+import time
+
+import metrics
+from complaint_store import MAX_PAGE_SIZE
+
+CELL_PRECISION = int(os.getenv("HOTSPOT_CELL_PRECISION", "5"))
+HALF_LIFE_H = float(os.getenv("HOTSPOT_HALF_LIFE_H", "72"))
+SYNC_INTERVAL_S = float(os.getenv("HOTSPOT_SYNC_S", "10"))
+HOURLY_SLOTS = 48
+DAILY_SLOTS = 31
+HOUR, DAY = 3600, 86400
+
+URGENCY_SCORE = {"Low": 1, "Medium": 2, "High": 3}
+_WINDOW = re.compile(r"^(\d+)([hd])$")
+
+
+def parse_window(window):
+    """'24h' / '7d' -> (resolution, n). Hour windows use the hourly ring, day windows the daily one."""
+    m = _WINDOW.match(window or "")
+    if not m:
+        raise ValueError("window must look like 24h, 7d or 30d")
+    n, unit = int(m.group(1)), m.group(2)
+    limit = HOURLY_SLOTS if unit == "h" else DAILY_SLOTS
+    if not 1 <= n <= limit:
+        raise ValueError(f"{unit} windows must be between 1{unit} and {limit}{unit}")
+    return unit, n
+
+
+def score_to_label(score):
+    if score >= 2.5:
+        return "High"
+    if score >= 1.5:
+        return "Medium"
+    return "Low"
+
+
+class _Ring:
+    __slots__ = ("epoch", "count", "urgency")
+
+    def __init__(self, size):
+        self.epoch = [-1] * size
+        self.count = [0] * size
+        self.urgency = [0] * size
+
+    def add(self, bucket, weight):
+        i = bucket % len(self.epoch)
+        if self.epoch[i] != bucket:
+            if self.epoch[i] > bucket:
+                return  # slot already holds a newer bucket: too old for this ring
+            self.epoch[i], self.count[i], self.urgency[i] = bucket, 0, 0
+        self.count[i] += 1
+        self.urgency[i] += weight
+
+    def total(self, newest, n):
+        """(count, urgency sum) over buckets (newest - n, newest]."""
+        count = urgency = 0
+        oldest = newest - n
+        for e, c, u in zip(self.epoch, self.count, self.urgency):
+            if oldest < e <= newest:
+                count += c
+                urgency += u
+        return count, urgency
+
+
+class Cell:
+    __slots__ = ("lat", "lng", "area", "hourly", "daily", "score", "score_ts",
+                 "last_ts", "sample_text")
+
+    def __init__(self, lat, lng, area):
+        self.lat, self.lng, self.area = lat, lng, area
+        self.hourly = _Ring(HOURLY_SLOTS)
+        self.daily = _Ring(DAILY_SLOTS)
+        self.score = 0.0
+        self.score_ts = 0.0
+        self.last_ts = 0.0
+        self.sample_text = None
+
+
+class HotspotEngine:
+    def __init__(self, half_life_h=HALF_LIFE_H, precision=CELL_PRECISION):
+        self.decay_rate = math.log(2) / (half_life_h * HOUR)
+        self.precision = precision
+        self.cells = {}
+        self.events = 0
+
+    def _decay(self, seconds):
+        return math.exp(-self.decay_rate * seconds)
+
+    def add(self, ts, lat, lng, area=None, urgency=None, text=None):
+        if lat is None or lng is None:
+            return False
+        if ts < time.time() - DAILY_SLOTS * DAY:
+            return False
+        key = (round(lat, self.precision), round(lng, self.precision))
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = Cell(key[0], key[1], area)
+        weight = URGENCY_SCORE.get(urgency, 1)
+
+        cell.hourly.add(int(ts // HOUR), weight)
+        cell.daily.add(int(ts // DAY), weight)
+        if ts >= cell.score_ts:
+            cell.score = cell.score * self._decay(ts - cell.score_ts) + weight
+            cell.score_ts = ts
+        else:
+            cell.score += weight * self._decay(cell.score_ts - ts)
+        if ts >= cell.last_ts:
+            cell.last_ts = ts
+            cell.area = area or cell.area
+            cell.sample_text = text or cell.sample_text
+        self.events += 1
+        return True
+
+    def expire(self, now=None):
+        """Drop cells with no report inside the longest window."""
+        cutoff = (now or time.time()) - DAILY_SLOTS * DAY
+        stale = [k for k, c in self.cells.items() if c.last_ts < cutoff]
+        for k in stale:
+            del self.cells[k]
+        return len(stale)
+
+    def hotspots(self, window="30d", now=None, min_count=1, limit=None):
+        """Cells with at least min_count reports in the window, highest decayed score first."""
+        unit, n = parse_window(window)
+        now = now or time.time()
+        self.expire(now)
+        newest = int(now // (HOUR if unit == "h" else DAY))
+
+        out = []
+        for cell in self.cells.values():
+            ring = cell.hourly if unit == "h" else cell.daily
+            count, urgency = ring.total(newest, n)
+            if count < min_count:
+                continue
+            avg = urgency / count
+            out.append({
+                "area": cell.area,
+                "lat": cell.lat,
+                "lng": cell.lng,
+                "count": count,
+                "avg_urgency_score": round(avg, 2),
+                "avg_urgency_label": score_to_label(avg),
+                "score": round(cell.score * self._decay(max(0.0, now - cell.score_ts)), 3),
+                "last_seen": cell.last_ts,
+                "sample_text": cell.sample_text,
+            })
+        out.sort(key=lambda h: -h["score"])
+        return out[:limit] if limit else out
+
+    def stats(self):
+        return {"active_cells": len(self.cells), "events": self.events,
+                "slots_per_cell": HOURLY_SLOTS + DAILY_SLOTS, "half_life_h": HALF_LIFE_H}
+
+
+# ------------------------------------------------------
+# FEED FROM THE COMPLAINT STORE
+# ------------------------------------------------------
+SYNC_FIELDS = ["id", "ts", "lat", "lng", "area", "urgency", "text", "duplicate"]
+
+
+class HotspotSync:
+    """Incrementally pulls newly committed complaints from the store into an engine."""
+
+    def __init__(self, engine, get_store, interval=SYNC_INTERVAL_S):
+        self.engine = engine
+        self.get_store = get_store
+        self.interval = interval
+        self.since = time.time() - DAILY_SLOTS * DAY   # committed_at high-water mark
+        self._seen = {}   # id -> committed_at, for rows inside the skew window
+        self._task = None
+        self.synced_at = None
+        self.store_has_rows = None  # unknown until the first sync
+
+    async def _pages(self, store, since):
+        """Pages of rows committed at or after `since`, oldest first."""
+        after = None
+        while True:
+            rows, after = await store.changes(SYNC_FIELDS, since=since, after=after, limit=MAX_PAGE_SIZE)
+            if rows:
+                yield rows
+            if after is None:
+                return
+
+    async def sync_once(self):
+        store = self.get_store()
+        skew = store.COMMIT_SKEW_S
+        n = 0
+        # one page in memory at a time; the high-water mark moves per page
+        async for rows in self._pages(store, self.since - skew):
+            for r in rows:
+                if r["id"] in self._seen:
+                    continue
+                self._seen[r["id"]] = r["committed_at"]
+                if r.get("duplicate"):
+                    continue  # repeat report of an incident already counted
+                self.engine.add(r["ts"], r["lat"], r["lng"], r["area"], r["urgency"], r["text"])
+            n += len(rows)
+            self.since = max(self.since, rows[-1]["committed_at"])
+            cutoff = self.since - skew
+            self._seen = {k: c for k, c in self._seen.items() if c >= cutoff}
+        if n:
+            self.store_has_rows = True
+        elif not self.store_has_rows:
+            # nothing recent; is the store empty (fresh install) or just quiet?
+            any_row, _ = await store.page(["id"], 1)
+            self.store_has_rows = bool(any_row)
+        self.synced_at = time.time()
+        return n
+
+    async def _run(self):
+        while True:
+            try:
+                with metrics.stage("hotspot_sync"):
+                    await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.record_error("hotspot_sync", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
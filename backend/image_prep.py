@@ -0,0 +1,78 @@
+# image_prep.py — shrink uploads before they are sent to the detector
+#
+# Phone photos are 4–12 MB; the detector works at ~640 px. We read the size
+# from the header, let the JPEG decoder downscale while decoding (draft),
+# apply EXIF orientation, thumbnail to the detector size and re-encode.
+# Boxes returned for the small image are mapped back to original pixels.
+
+import os
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+DETECTOR_SIZE = int(os.getenv("DETECTOR_SIZE", "640"))
+JPEG_QUALITY = int(os.getenv("DETECTOR_JPEG_QUALITY", "85"))
+
+# EXIF orientations that swap width and height
+_TRANSPOSED = {5, 6, 7, 8}
+_EXIF_ORIENTATION = 0x0112
+
+
+@dataclass
+class PreparedImage:
+    data: bytes          # bytes to send to the detector
+    image: Image.Image   # decoded, oriented, downscaled image
+    width: int           # original (oriented) width
+    height: int          # original (oriented) height
+    scale_x: float       # original / sent
+    scale_y: float
+
+
+def prepare(source, max_side=DETECTOR_SIZE, quality=JPEG_QUALITY):
+    """Decode at reduced scale, orient, downscale and re-encode as JPEG."""
+    img = Image.open(_as_file(source))
+    orientation = img.getexif().get(_EXIF_ORIENTATION, 1)
+    w, h = img.size
+    if orientation in _TRANSPOSED:
+        w, h = h, w
+
+    # JPEG only: decode directly at 1/2, 1/4 or 1/8 scale, never below max_side
+    img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+
+    out = BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return PreparedImage(
+        data=out.getvalue(),
+        image=img,
+        width=w,
+        height=h,
+        scale_x=w / img.width,
+        scale_y=h / img.height,
+    )
+
+
+def scale_predictions(predictions, scale_x, scale_y):
+    """Map detector boxes (centre/size format) back to original image pixels."""
+    if scale_x == 1 and scale_y == 1:
+        return predictions
+    scaled = []
+    for p in predictions:
+        p = dict(p)
+        for k, s in (("x", scale_x), ("width", scale_x), ("y", scale_y), ("height", scale_y)):
+            if k in p:
+                p[k] = p[k] * s
+        if "points" in p:
+            p["points"] = [{**pt, "x": pt["x"] * scale_x, "y": pt["y"] * scale_y} for pt in p["points"]]
+        scaled.append(p)
+    return scaled
+
+
+def _as_file(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return BytesIO(source)
+    return source  # path or file object
@@ -0,0 +1,179 @@
+# incident_index.py — group near-duplicate complaints into incidents
+#
+# The same broken streetlight gets reported dozens of times. Each complaint
+# gets a MinHash signature over word shingles; an LSH banding index finds
+# candidate incidents with similar text in O(bands), and a candidate only
+# matches if it is also nearby (haversine on lat/lng, or same area when no
+# coordinates were sent). A match reuses the incident's stored analysis.
+#
+# The index is in-memory and per process: dedup only sees reports handled by
+# the same worker, and restarts forget every incident.
+
+import math
+import os
+import re
+import random
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+
+NUM_PERM = 64
+BANDS = 16                      # 16 bands x 4 rows: ~50% Jaccard detection threshold
+ROWS = NUM_PERM // BANDS
+SIMILARITY_THRESHOLD = float(os.getenv("INCIDENT_SIMILARITY", "0.6"))
+RADIUS_M = float(os.getenv("INCIDENT_RADIUS_M", "250"))
+TTL_S = float(os.getenv("INCIDENT_TTL_HOURS", "72")) * 3600
+MAX_INCIDENTS = int(os.getenv("INCIDENT_MAX", "50000"))
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)  # fixed seed: signatures are stable across restarts
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text, k=3):
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) < k:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+
+def minhash(text):
+    hashes = [zlib.crc32(s.encode()) for s in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    r = 6_371_000
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
+
+
+class Incident:
+    __slots__ = ("id", "signature", "lat", "lng", "area", "created", "last_seen",
+                 "reports", "analysis", "sample_text")
+
+    def __init__(self, signature, lat, lng, area, analysis, text):
+        self.id = uuid.uuid4().hex[:12]
+        self.signature = signature
+        self.lat, self.lng, self.area = lat, lng, area
+        self.created = self.last_seen = time.time()
+        self.reports = 1
+        self.analysis = analysis
+        self.sample_text = text
+
+    def to_dict(self):
+        return {
+            "incident_id": self.id,
+            "reports": self.reports,
+            "lat": self.lat,
+            "lng": self.lng,
+            "area": self.area,
+            "category": self.analysis.get("category"),
+            "urgency": self.analysis.get("urgency"),
+            "first_seen": self.created,
+            "last_seen": self.last_seen,
+            "sample_text": self.sample_text,
+        }
+
+
+class IncidentIndex:
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, radius_m=RADIUS_M,
+                 ttl_s=TTL_S, max_incidents=MAX_INCIDENTS):
+        self.threshold = threshold
+        self.radius_m = radius_m
+        self.ttl_s = ttl_s
+        self.max_incidents = max_incidents
+        self._incidents = OrderedDict()  # id -> Incident, least recently seen first
+        self._buckets = {}               # (band, rows) -> set of incident ids
+        self.matched = 0
+
+    def _bands(self, sig):
+        return [(b, sig[b * ROWS:(b + 1) * ROWS]) for b in range(BANDS)]
+
+    def _near(self, inc, lat, lng, area):
+        if lat is not None and lng is not None and inc.lat is not None and inc.lng is not None:
+            return haversine_m(lat, lng, inc.lat, inc.lng) <= self.radius_m
+        if area and inc.area:
+            return area.strip().lower() == inc.area.strip().lower()
+        # no location on either side: only trust near-identical text
+        return None
+
+    def find(self, text, lat=None, lng=None, area=None):
+        """Return (incident, signature); incident is None when nothing matches."""
+        self._expire()
+        sig = minhash(text)
+        if sig is None:
+            return None, None
+
+        candidates = set()
+        for key in self._bands(sig):
+            candidates |= self._buckets.get(key, set())
+
+        best, best_sim = None, 0.0
+        for inc_id in candidates:
+            inc = self._incidents[inc_id]
+            sim = similarity(sig, inc.signature)
+            near = self._near(inc, lat, lng, area)
+            needed = self.threshold if near else max(self.threshold, 0.85)
+            if near is False or sim < needed:
+                continue
+            if sim > best_sim:
+                best, best_sim = inc, sim
+        return best, sig
+
+    def attach(self, incident):
+        """Record another report of an existing incident."""
+        incident.reports += 1
+        incident.last_seen = time.time()
+        self._incidents.move_to_end(incident.id)
+        self.matched += 1
+        return incident
+
+    def add(self, signature, text, analysis, lat=None, lng=None, area=None):
+        if signature is None:
+            return None
+        inc = Incident(signature, lat, lng, area, analysis, text)
+        self._incidents[inc.id] = inc
+        for key in self._bands(signature):
+            self._buckets.setdefault(key, set()).add(inc.id)
+        while len(self._incidents) > self.max_incidents:
+            self._remove(next(iter(self._incidents)))
+        return inc
+
+    def _remove(self, inc_id):
+        inc = self._incidents.pop(inc_id)
+        for key in self._bands(inc.signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(inc_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_s
+        while self._incidents:
+            inc = next(iter(self._incidents.values()))
+            if inc.last_seen >= cutoff:
+                break
+            self._remove(inc.id)
+
+    def incidents(self, min_reports=1, limit=500):
+        self._expire()
+        found = [i for i in reversed(self._incidents.values()) if i.reports >= min_reports]
+        found.sort(key=lambda i: -i.reports)
+        return [i.to_dict() for i in found[:limit]]
+
+    def stats(self):
+        return {"incidents": len(self._incidents), "matched_reports": self.matched,
+                "buckets": len(self._buckets)}
@@ -0,0 +1,206 @@
+# metrics.py — per-stage timings, counters and a Prometheus /metrics endpoint
+#
+# Hot-path cost is a perf_counter() pair, a bisect and a locked increment per
+# stage; no third-party client library is needed.
+#
+#   with stage("embed"):
+#       emb = embedder.encode(...)
+#
+# records the duration in the `civic_stage_seconds{stage="embed"}` histogram
+# and, inside a request handled by MetricsMiddleware, adds `embed;dur=12.3`
+# to that response's Server-Timing header.
+
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+log = logging.getLogger("civic")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_timings = contextvars.ContextVar("server_timings", default=None)
+
+
+def _fmt_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                     for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+    def items(self):
+        with self._lock:
+            return [(k, v if not isinstance(v, list) else [list(v[0]), v[1], v[2]])
+                    for k, v in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, n=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + n
+
+    def render(self):
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.label_names, k)} {v}" for k, v in self.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, n=1):
+        self.inc(*labels, n=-n)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = self.header()
+        for labels, (counts, total, count) in self.items():
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.label_names + ('le',), labels + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.label_names, labels)} {total}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram("civic_stage_seconds", "Time spent per pipeline stage", ["stage"])
+REQUEST_SECONDS = Histogram("civic_request_seconds", "HTTP request latency", ["method", "route", "status"])
+IN_FLIGHT = Gauge("civic_requests_in_flight", "Requests currently being handled")
+CACHE_REQUESTS = Counter("civic_cache_requests_total", "Cache lookups by result", ["cache", "result"])
+ERRORS = Counter("civic_errors_total", "Handled errors by location", ["where"])
+QUEUE_DEPTH = Gauge("civic_analyze_queue_depth", "Requests waiting for an /analyze generation slot", ["priority"])
+QUEUE_SECONDS = Histogram("civic_analyze_queue_seconds", "Wait for an /analyze generation slot", ["priority"])
+MODEL_INFO = Gauge("civic_model_info", "Loaded model versions", ["model", "version"])
+
+
+# ------------------------------------------------------
+# HELPERS
+# ------------------------------------------------------
+@contextmanager
+def stage(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        STAGE_SECONDS.observe(name, value=elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def record_error(where, exc):
+    ERRORS.inc(where)
+    log.warning("%s: %s", where, exc)
+
+
+def set_model_info(model, version):
+    MODEL_INFO.set(model, str(version), value=1)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------
+# ASGI MIDDLEWARE + ENDPOINT
+# ------------------------------------------------------
+class MetricsMiddleware:
+    """Times every HTTP request and emits the collected stages as Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = []
+        token = _timings.set(timings)
+        status = {"code": 500}
+        t0 = time.perf_counter()
+        IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                total = (time.perf_counter() - t0) * 1000
+                parts = [f"{n};dur={d * 1000:.1f}" for n, d in timings] + [f"app;dur={total:.1f}"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", ", ".join(parts).encode()))
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            _timings.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(scope["method"], path, str(status["code"]),
+                                    value=time.perf_counter() - t0)
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
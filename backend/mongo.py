@@ -0,0 +1,129 @@
+# mongo.py — lazily connected, pooled async MongoDB client
+#
+# Nothing here touches the network at import time. The client is created on
+# first use and a background task keeps pinging the server, so a Mongo outage
+# at startup no longer stalls the app or leaves it in fallback mode forever.
+
+import asyncio
+import os
+import time
+
+MONGO_URI = os.getenv("MONGO_URI") or "mongodb://localhost:27017"
+DB_NAME = os.getenv("MONGO_DB", "civic_db")
+
+# Pool sizes are per process; keep them small when running several workers.
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+HEALTH_INTERVAL = float(os.getenv("MONGO_HEALTH_INTERVAL", "15"))
+MAX_BACKOFF = 60.0
+
+
+class MongoState:
+    """Owns the Motor client and tracks whether the server is reachable."""
+
+    def __init__(self, uri=MONGO_URI, db_name=DB_NAME):
+        self.uri = uri
+        self.db_name = db_name
+        self.client = None
+        self.healthy = False
+        self.last_error = None
+        self.last_ok = None
+        self._task = None
+        self._on_connect = []
+        self._on_close = []
+
+    def on_connect(self, fn):
+        """Register an async callback run with the db after each (re)connect."""
+        self._on_connect.append(fn)
+        return fn
+
+    def on_close(self, fn):
+        """Register an async callback run before the client is closed (e.g. final flushes)."""
+        self._on_close.append(fn)
+        return fn
+
+    def _create_client(self):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        return AsyncIOMotorClient(
+            self.uri,
+            maxPoolSize=MAX_POOL_SIZE,
+            minPoolSize=MIN_POOL_SIZE,
+            maxIdleTimeMS=60_000,
+            serverSelectionTimeoutMS=2000,
+            connectTimeoutMS=2000,
+            socketTimeoutMS=10_000,
+            retryWrites=True,
+        )
+
+    def start(self):
+        """Start the background health/reconnect loop (idempotent, never blocks)."""
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; get_db() will start us on first use
+        self._task = loop.create_task(self._monitor())
+
+    async def _monitor(self):
+        backoff = 1.0
+        while True:
+            was_healthy = self.healthy
+            try:
+                if self.client is None:
+                    self.client = self._create_client()
+                await self.client.admin.command("ping")
+                self.healthy = True
+                self.last_ok = time.time()
+                self.last_error = None
+                backoff = 1.0
+                if not was_healthy:
+                    print("MongoDB connected")
+                    for fn in self._on_connect:
+                        try:
+                            await fn(self.client[self.db_name])
+                        except Exception as e:
+                            print(f"MongoDB on-connect hook failed: {e}")
+                await asyncio.sleep(HEALTH_INTERVAL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if was_healthy or self.last_error is None:
+                    print(f"MongoDB connection failed: {e}")
+                self.healthy = False
+                self.last_error = str(e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def get_db(self):
+        """Return the database if Mongo is reachable, else None."""
+        self.start()
+        if not self.healthy:
+            return None
+        return self.client[self.db_name]
+
+    def status(self):
+        return {
+            "healthy": self.healthy,
+            "last_ok": self.last_ok,
+            "last_error": self.last_error,
+            "max_pool_size": MAX_POOL_SIZE,
+        }
+
+    async def close(self):
+        for fn in self._on_close:
+            try:
+                await fn()
+            except Exception as e:
+                print(f"MongoDB on-close hook failed: {e}")
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+        self.healthy = False
+
+
+mongo = MongoState()
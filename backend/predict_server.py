@@ -1,10 +1,33 @@
-import joblib
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-app = FastAPI()
+import metrics
+from responses import CompressionMiddleware, FastJSONResponse
+import runtime_config
+from metrics import stage
+from shared_models import models
 
+runtime_config.configure()
+
+router = APIRouter()
+
+class PredictIn(BaseModel):
+    text: str
+
+@router.post("/predict")
+def predict(p: PredictIn):
+    with stage("vectorize"):
+        X = models.vectorizer.transform([p.text])
+    with stage("classify"):
+        cat = models.cat_model.predict(X)[0]
+        urg = models.urg_model.predict(X)[0]
+    return {"category": cat, "urgency": urg}
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
 # CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -14,17 +37,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load ML models
-vectorizer = joblib.load("models/vectorizer.pkl")
-cat_model = joblib.load("models/category_model.pkl")
-urg_model = joblib.load("models/urgency_model.pkl")
-
-class PredictIn(BaseModel):
-    text: str
+app.include_router(router)
+app.include_router(metrics.router)
 
-@app.post("/predict")
-def predict(p: PredictIn):
-    X = vectorizer.transform([p.text])
-    cat = cat_model.predict(X)[0]
-    urg = urg_model.predict(X)[0]
-    return {"category": cat, "urgency": urg}
\ No newline at end of file
+# Load ML models when this app starts (not on import, so unified_server can
+# mount the router without side effects)
+@app.on_event("startup")
+def load_models():
+    models.load_all(rag=False)
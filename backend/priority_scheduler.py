@@ -0,0 +1,148 @@
+# priority_scheduler.py — urgency-ordered admission to the slow RAG/LLM stage
+#
+# /analyze classifies first (cheap), then waits here for one of a fixed
+# number of generation slots. Waiters are served by urgency, not arrival, so
+# a High drainage report overtakes a queue of Low garbage complaints. Under
+# load, deferrable (Low) work degrades to a retrieval-only answer instead of
+# waiting behind everyone for a Gemini call.
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+
+from fastapi.concurrency import run_in_threadpool
+
+import metrics
+
+PRIORITY = {"Critical": 0, "High": 0, "Medium": 1, "Low": 2}
+PRIORITY_NAMES = {0: "high", 1: "medium", 2: "low"}
+DEFAULT_PRIORITY = 1
+
+CONCURRENCY = int(os.getenv("ANALYZE_CONCURRENCY", "4"))
+DEGRADE_QUEUE_DEPTH = int(os.getenv("DEGRADE_QUEUE_DEPTH", "16"))
+LOW_MAX_WAIT_S = float(os.getenv("LOW_MAX_WAIT_S", "10"))
+
+
+def priority_for(urgency):
+    return PRIORITY.get(urgency, DEFAULT_PRIORITY)
+
+
+class _Stats:
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.degraded = 0
+        self.queue_ms = deque(maxlen=1000)  # recent samples for percentiles
+
+    def snapshot(self, queued):
+        samples = sorted(self.queue_ms)
+
+        def pct(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 1) if samples else 0.0
+
+        return {
+            "queued": queued,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "degraded": self.degraded,
+            "queue_ms_p50": pct(0.50),
+            "queue_ms_p95": pct(0.95),
+            "queue_ms_max": round(samples[-1], 1) if samples else 0.0,
+        }
+
+
+class PriorityScheduler:
+    def __init__(self, concurrency=CONCURRENCY, degrade_depth=DEGRADE_QUEUE_DEPTH,
+                 low_max_wait=LOW_MAX_WAIT_S):
+        self.concurrency = concurrency
+        self.degrade_depth = degrade_depth
+        self.low_max_wait = low_max_wait
+        self._running = 0
+        self._heap = []   # (priority, seq, future); done futures are skipped when popped
+        self._waiting = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._seq = itertools.count()
+        self._stats = {p: _Stats() for p in PRIORITY_NAMES}
+
+    def _queued(self, priority=None):
+        if priority is None:
+            return sum(self._waiting.values())
+        return self._waiting[priority]
+
+    async def _acquire(self, priority, timeout=None):
+        if self._running < self.concurrency and not self._queued():
+            self._running += 1
+            return True
+        # timed-out and cancelled waiters leave their future behind; drop the
+        # ones at the top now, _release() skips the rest
+        while self._heap and self._heap[0][2].done():
+            heapq.heappop(self._heap)
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (priority, next(self._seq), fut))
+        self._waiting[priority] += 1
+        metrics.QUEUE_DEPTH.set(PRIORITY_NAMES[priority], value=self._waiting[priority])
+        try:
+            await asyncio.wait_for(fut, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return fut.done() and not fut.cancelled()
+        except asyncio.CancelledError:
+            # a slot may have been handed to us just before cancellation
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        finally:
+            self._waiting[priority] -= 1
+            metrics.QUEUE_DEPTH.set(PRIORITY_NAMES[priority], value=self._waiting[priority])
+
+    def _release(self):
+        # hand the slot straight to the most urgent live waiter
+        while self._heap:
+            _, _, fut = heapq.heappop(self._heap)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._running -= 1
+
+    async def run(self, urgency, fn, *args, degrade=None):
+        """
+        Run fn(*args) in the threadpool once a slot is free, highest urgency
+        first. Returns (result, degraded). If `degrade` is given and the work
+        is deferrable, the system is saturated or the wait is too long, run
+        degrade(*args) instead without taking a slot.
+        """
+        priority = priority_for(urgency)
+        stats = self._stats[priority]
+        stats.submitted += 1
+        deferrable = degrade is not None and priority == max(PRIORITY_NAMES)
+
+        t0 = time.perf_counter()
+        if deferrable and self._queued() >= self.degrade_depth:
+            acquired = False
+        else:
+            acquired = await self._acquire(priority, self.low_max_wait if deferrable else None)
+        waited = time.perf_counter() - t0
+        stats.queue_ms.append(waited * 1000)
+        metrics.QUEUE_SECONDS.observe(PRIORITY_NAMES[priority], value=waited)
+
+        if not acquired:
+            stats.degraded += 1
+            return await run_in_threadpool(degrade, *args), True
+        try:
+            return await run_in_threadpool(fn, *args), False
+        finally:
+            stats.completed += 1
+            self._release()
+
+    def stats(self):
+        return {
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "degrade_queue_depth": self.degrade_depth,
+            "priorities": {
+                name: self._stats[p].snapshot(self._queued(p))
+                for p, name in PRIORITY_NAMES.items()
+            },
+        }
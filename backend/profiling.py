@@ -0,0 +1,237 @@
+# profiling.py — admin-only CPU sampling profiler and tracemalloc snapshots
+#
+# For a worker pegged at 100% CPU or growing in RSS, without restarting it:
+#
+#   curl -H "X-Admin-Token: $ADMIN_TOKEN" "localhost:8000/admin/profile?seconds=15" > out.folded
+#   flamegraph.pl out.folded > flame.svg        # or load out.folded in speedscope
+#
+#   curl -X POST -H "X-Admin-Token: ..." localhost:8000/admin/memory/start
+#   curl -X POST -H "X-Admin-Token: ..." localhost:8000/admin/memory/snapshot   # twice, minutes apart
+#   curl -H "X-Admin-Token: ..." localhost:8000/admin/memory/diff
+#
+# Nothing runs until asked: the sampler thread exists only for the duration of
+# a profile, and tracemalloc is off until /admin/memory/start. The endpoints
+# are disabled (404) unless ADMIN_TOKEN is set. With pre-forked workers each
+# request profiles whichever worker accepted it; the pid is in the response.
+
+import asyncio
+import collections
+import gc
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MAX_PROFILE_SECONDS = float(os.getenv("MAX_PROFILE_SECONDS", "60"))
+MAX_SNAPSHOTS = 4
+
+# a thread whose innermost frame is in one of these is blocked, not burning CPU
+IDLE_FILES = ("selectors.py", "threading.py", "queue.py", "socket.py")
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+# ------------------------------------------------------
+# CPU SAMPLING PROFILER
+# ------------------------------------------------------
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds, interval, include_idle=False):
+    """
+    Sample every thread's Python stack each `interval` seconds for `seconds`.
+    Returns (Counter of collapsed stacks "thread;outer;...;inner", samples taken).
+    """
+    me = threading.get_ident()
+    counts = collections.Counter()
+    samples = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if not include_idle and stack and stack[0].split(" (")[1].startswith(IDLE_FILES):
+                continue
+            stack.append(names.get(ident, str(ident)))
+            counts[";".join(reversed(stack))] += 1
+        samples += 1
+        time.sleep(interval)
+    return counts, samples
+
+
+_profile_lock = asyncio.Lock()
+
+
+@router.get("/profile")
+async def profile(seconds: float = 10, interval_ms: float = 5, format: str = "collapsed",
+                  include_idle: bool = False, top: int = 50):
+    """Time-boxed sampling profile of this worker. format=collapsed (flamegraph) or json."""
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {MAX_PROFILE_SECONDS}]")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        counts, samples = await run_in_threadpool(
+            sample_stacks, seconds, max(interval_ms, 1) / 1000, include_idle
+        )
+
+    headers = {"X-Worker-Pid": str(os.getpid()), "X-Samples": str(samples)}
+    if format == "collapsed":
+        body = "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+        return PlainTextResponse(body, headers=headers)
+
+    # json: hottest leaf functions (self time) plus the hottest full stacks
+    leaves = collections.Counter()
+    for stack, n in counts.items():
+        leaves[stack.rsplit(";", 1)[-1]] += n
+    total = sum(counts.values()) or 1
+    return {
+        "pid": os.getpid(),
+        "seconds": seconds,
+        "samples": samples,
+        "top_functions": [{"frame": f, "samples": n, "pct": round(100 * n / total, 1)}
+                          for f, n in leaves.most_common(top)],
+        "top_stacks": [{"stack": s.split(";"), "samples": n} for s, n in counts.most_common(top)],
+    }
+
+
+# ------------------------------------------------------
+# MEMORY SNAPSHOTS
+# ------------------------------------------------------
+_snapshots = collections.OrderedDict()  # id -> (timestamp, tracemalloc.Snapshot)
+_next_id = 0
+
+
+def _process_memory():
+    rss = peak = None
+    try:
+        import resource  # Unix only
+
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024
+        with open("/proc/self/statm") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (ImportError, OSError):
+        pass
+    if rss is None or peak is None:
+        try:
+            import psutil
+
+            info = psutil.Process().memory_info()
+            rss = rss or info.rss
+            peak = peak or getattr(info, "peak_wset", None)  # Windows only
+        except ImportError:
+            pass
+    if peak is None and tracemalloc.is_tracing():
+        peak = tracemalloc.get_traced_memory()[1]  # Python heap only
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": rss,
+        "peak_rss_bytes": peak,
+        "gc_objects": len(gc.get_objects()),
+    }
+
+
+def _stat_dict(stat):
+    frame = stat.traceback[0]
+    return {"file": frame.filename, "line": frame.lineno,
+            "size_bytes": stat.size, "count": stat.count}
+
+
+def _diff_dict(stat):
+    return {**_stat_dict(stat), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+
+
+def _filtered(snapshot):
+    return snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+@router.post("/memory/start")
+def memory_start(frames: int = 1):
+    """Start tracing allocations (slows allocation-heavy code while active)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, min(frames, 50)))
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), **_process_memory()}
+
+
+@router.post("/memory/stop")
+def memory_stop():
+    tracemalloc.stop()
+    _snapshots.clear()
+    return {"tracing": False, **_process_memory()}
+
+
+@router.post("/memory/snapshot")
+def memory_snapshot(top: int = 25):
+    """Take a snapshot (the last MAX_SNAPSHOTS are kept) and list the largest allocation sites."""
+    global _next_id
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST /admin/memory/start")
+
+    snapshot = _filtered(tracemalloc.take_snapshot())
+    _next_id += 1
+    _snapshots[_next_id] = (time.time(), snapshot)
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "id": _next_id,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        **_process_memory(),
+        "top": [_stat_dict(s) for s in snapshot.statistics("lineno")[:top]],
+    }
+
+
+@router.get("/memory/diff")
+def memory_diff(base: int | None = None, target: int | None = None, top: int = 25,
+                group_by: str = "lineno"):
+    """Allocation growth between two snapshots (default: the last two)."""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    ids = list(_snapshots)
+    if len(ids) < 2 and (base is None or target is None):
+        raise HTTPException(status_code=409, detail="Need at least two snapshots")
+    base = ids[-2] if base is None else base
+    target = ids[-1] if target is None else target
+    if base not in _snapshots or target not in _snapshots:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot; available: {ids}")
+
+    t0, old = _snapshots[base]
+    t1, new = _snapshots[target]
+    stats = new.compare_to(old, group_by)
+    return {
+        "base": base,
+        "target": target,
+        "seconds_between": round(t1 - t0, 1),
+        "size_diff_bytes": sum(s.size_diff for s in stats),
+        "top": [_diff_dict(s) for s in stats[:top]],
+    }
@@ -0,0 +1,177 @@
+# rag/chunker.py — offset-based, sentence/paragraph-aware text chunking
+#
+# Replaces langchain's RecursiveCharacterTextSplitter. Chunks are computed as
+# (start, end) offsets into the original string using str.rfind/str.find and
+# regex scans with pos/endpos, so no intermediate substrings are built; the
+# caller slices text[start:end] only when it needs the chunk text.
+#
+# Each chunk ends at the best boundary inside its size window, preferring a
+# paragraph break, then a line break, then a sentence end, then whitespace.
+# The next chunk starts about `overlap` units before the end, moved forward to
+# a sentence or word start.
+#
+#   spans = chunk_spans(text, chunk_size=400, overlap=80)             # characters
+#   spans = chunk_spans(text, chunk_size=96, overlap=16, unit="tokens")
+#   for span, chunk in iter_file_chunks("big.txt"):                  # streaming
+#       ...
+
+import re
+from typing import NamedTuple
+
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+MIN_FILL = 0.5            # never end a chunk in the first half of its window
+BLOCK_CHARS = 1 << 22     # streaming read size (4M characters)
+
+# approximate word-piece tokens; pass token_pattern to match a real tokenizer
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_ENDS = (". ", "! ", "? ", ".\n", "!\n", "?\n")
+_NOT_SPACE = re.compile(r"\S")
+
+
+class Span(NamedTuple):
+    source: str
+    start: int
+    end: int
+
+    def text(self, doc):
+        return doc[self.start:self.end]
+
+
+def _skip_space(text, pos, limit):
+    m = _NOT_SPACE.search(text, pos, limit)
+    return m.start() if m else limit
+
+
+def _boundary(text, lo, hi):
+    """Best chunk end in (lo, hi]: paragraph > line > sentence > word > hard cut."""
+    i = text.rfind("\n\n", lo, hi)
+    if i > lo:
+        return i
+    i = text.rfind("\n", lo, hi)
+    if i > lo:
+        return i
+    best = max(text.rfind(p, lo, hi + 1) for p in _SENTENCE_ENDS)
+    if best > lo:
+        return best + 1  # keep the terminator
+    i = text.rfind(" ", lo, hi)
+    if i > lo:
+        return i
+    return hi
+
+
+def _overlap_start(text, lo, end):
+    """Start of the next chunk: a sentence start in [lo, end), else a word start."""
+    best = min((i for i in (text.find(p, lo, end) for p in _SENTENCE_ENDS) if i != -1), default=-1)
+    if best != -1 and best + 2 < end:
+        return best + 2
+    i = text.find(" ", lo, end)
+    if i != -1 and i + 1 < end:
+        return i + 1
+    return lo
+
+
+class _CharWindow:
+    def __init__(self, chunk_size, overlap):
+        self.size, self.overlap = chunk_size, overlap
+
+    def end(self, text, start, n):
+        return min(start + self.size, n)
+
+    def back(self, text, start, end):
+        return max(end - self.overlap, start + 1)
+
+
+class _TokenWindow:
+    def __init__(self, chunk_size, overlap, pattern):
+        self.size, self.overlap, self.pattern = chunk_size, overlap, pattern
+        self._starts = []
+
+    def end(self, text, start, n):
+        self._starts = []
+        last = start
+        for m in self.pattern.finditer(text, start, n):
+            if len(self._starts) == self.size:
+                return m.start()
+            self._starts.append(m.start())
+            last = m.end()
+        return n if len(self._starts) < self.size else last
+
+    def back(self, text, start, end):
+        inside = [s for s in self._starts if s < end]
+        if len(inside) <= self.overlap:
+            return end
+        return max(inside[len(inside) - self.overlap], start + 1)
+
+
+def _window(chunk_size, overlap, unit, token_pattern):
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    if unit == "chars":
+        return _CharWindow(chunk_size, overlap)
+    if unit == "tokens":
+        return _TokenWindow(chunk_size, overlap, token_pattern or TOKEN_PATTERN)
+    raise ValueError(f"unit must be 'chars' or 'tokens', not {unit!r}")
+
+
+def _scan(text, window, pos, n, final):
+    """
+    Yield (start, end) chunk offsets in text[pos:n]. If not final, stop before
+    a chunk whose window reaches n (more text may follow) and report where to
+    resume via the generator's return value.
+    """
+    pos = _skip_space(text, pos, n)
+    while pos < n:
+        hi = window.end(text, pos, n)
+        if hi >= n and not final:
+            return pos
+        if hi >= n:
+            end = n
+        else:
+            end = _boundary(text, pos + max(1, int((hi - pos) * MIN_FILL)), hi)
+        # trim trailing whitespace without copying
+        trimmed = end
+        while trimmed > pos and text[trimmed - 1].isspace():
+            trimmed -= 1
+        if trimmed > pos:
+            yield pos, trimmed
+        if end >= n:
+            return n
+        nxt = _overlap_start(text, window.back(text, pos, end), end)
+        pos = _skip_space(text, max(nxt, pos + 1), n)
+    return n
+
+
+def chunk_spans(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, unit="chars",
+                token_pattern=None, source=None):
+    """Return [Span(source, start, end)] covering text."""
+    window = _window(chunk_size, overlap, unit, token_pattern)
+    return [Span(source, s, e) for s, e in _scan(text, window, 0, len(text), True)]
+
+
+def iter_file_chunks(path, source=None, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP,
+                     unit="chars", token_pattern=None, encoding="utf8", block_chars=BLOCK_CHARS):
+    """
+    Stream a large text file: yield (Span, chunk_text) with character offsets
+    into the decoded file. Memory stays at about one block plus one chunk.
+    """
+    window = _window(chunk_size, overlap, unit, token_pattern)
+    source = source if source is not None else str(path)
+    buf, buf_offset = "", 0
+    with open(path, encoding=encoding) as f:
+        while True:
+            block = f.read(block_chars)
+            final = not block
+            buf += block
+            scan = _scan(buf, window, 0, len(buf), final)
+            while True:
+                try:
+                    s, e = next(scan)
+                except StopIteration as stop:
+                    resume = stop.value if stop.value is not None else len(buf)
+                    break
+                yield Span(source, buf_offset + s, buf_offset + e), buf[s:e]
+            if final:
+                return
+            buf_offset += resume
+            buf = buf[resume:]
@@ -0,0 +1,130 @@
+# rag/context.py — turn retrieved chunks into a compact, budgeted prompt context
+#
+# Chunks from build_index.py overlap by 80 characters, so neighbouring hits
+# repeat text, and the prompt grows linearly with top_k. assemble_context():
+#   1. merges adjacent chunks of the same source, dropping the overlap
+#   2. drops sentences that are near-duplicates of ones already kept
+#      (embedding cosine, or exact match when no embedder is given)
+#   3. keeps sentences in retrieval-rank order until the token budget is hit
+
+import os
+import re
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "600"))
+SENTENCE_SIMILARITY = float(os.getenv("CONTEXT_SENTENCE_SIMILARITY", "0.92"))
+MAX_OVERLAP = 200
+
+_SENTENCE = re.compile(r"(?<=[^\d\s][.!?])\s+|\n+")  # not after list numbers like "1."
+_CHUNK_ID = re.compile(r"^(.*)__(\d+)$")
+
+
+def estimate_tokens(text):
+    """Rough LLM token count (~4 characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def _chunk_index(doc):
+    m = _CHUNK_ID.match(doc.get("id", ""))
+    return (m.group(1), int(m.group(2))) if m else (doc.get("id"), None)
+
+
+def _overlap(a, b):
+    """Length of the longest suffix of a that is a prefix of b."""
+    for n in range(min(len(a), len(b), MAX_OVERLAP), 0, -1):
+        if a.endswith(b[:n]):
+            return n
+    return 0
+
+
+def merge_adjacent(docs):
+    """Merge consecutive chunks (source__i, source__i+1) into one passage, keeping rank order."""
+    groups = {}
+    for rank, d in enumerate(docs):
+        base, idx = _chunk_index(d)
+        groups.setdefault(d.get("source"), []).append((idx, rank, base, d))
+
+    merged = []
+    for source, items in groups.items():
+        items.sort(key=lambda t: (t[2], t[0] if t[0] is not None else -1))
+        current = None
+        for idx, rank, base, d in items:
+            if (current is not None and idx is not None and current["base"] == base
+                    and current["last"] == idx - 1):
+                cut = _overlap(current["text"], d["text"])
+                current["text"] += d["text"][cut:]
+                current["last"] = idx
+                current["rank"] = min(current["rank"], rank)
+                current["ids"].append(d["id"])
+                continue
+            if current is not None:
+                merged.append(current)
+            current = {"source": source, "text": d["text"], "base": base, "last": idx,
+                       "rank": rank, "ids": [d.get("id")]}
+        if current is not None:
+            merged.append(current)
+
+    merged.sort(key=lambda m: m["rank"])
+    return merged
+
+
+def _sentences(text):
+    return [s.strip() for s in _SENTENCE.split(text) if s and s.strip()]
+
+
+def assemble_context(docs, budget_tokens=CONTEXT_TOKEN_BUDGET, embedder=None,
+                     similarity=SENTENCE_SIMILARITY, with_sources=False):
+    """Return (context_text, stats) for the retrieved docs."""
+    passages = merge_adjacent(docs)
+    units = [(p["source"], s) for p in passages for s in _sentences(p["text"])]
+
+    vectors = None
+    if embedder is not None and len(units) > 1:
+        try:
+            vectors = embedder.encode([s for _, s in units], convert_to_numpy=True)
+        except Exception as e:
+            print(f"Context dedup falling back to exact match: {e}")
+
+    kept, kept_vecs, seen = [], [], set()
+    used, dropped_dup, dropped_budget = 0, 0, 0
+    for i, (source, sentence) in enumerate(units):
+        key = " ".join(sentence.lower().split())
+        if key in seen:
+            dropped_dup += 1
+            continue
+        if vectors is not None:
+            v = vectors[i]
+            # embeddings are L2-normalized, so the dot product is the cosine
+            if any(float(v @ k) >= similarity for k in kept_vecs):
+                dropped_dup += 1
+                continue
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > budget_tokens:
+            # stop at the first sentence that does not fit: lower-ranked text is
+            # less relevant, and skipping ahead would leave disjointed fragments
+            dropped_budget = len(units) - i
+            break
+        seen.add(key)
+        if vectors is not None:
+            kept_vecs.append(vectors[i])
+        kept.append((source, sentence))
+        used += cost
+
+    # regroup kept sentences by source, in the order sources first appear
+    blocks = {}
+    for source, sentence in kept:
+        blocks.setdefault(source, []).append(sentence)
+    if with_sources:
+        context = "\n\n".join(f"[{src}]\n" + "\n".join(s) for src, s in blocks.items())
+    else:
+        context = "\n\n".join("\n".join(s) for s in blocks.values())
+
+    stats = {
+        "chunks_in": len(docs),
+        "passages": len(passages),
+        "sentences_kept": len(kept),
+        "sentences_dropped_duplicate": dropped_dup,
+        "sentences_dropped_budget": dropped_budget,
+        "context_tokens": estimate_tokens(context),
+        "budget_tokens": budget_tokens,
+    }
+    return context, stats
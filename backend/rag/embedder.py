@@ -0,0 +1,148 @@
+# rag/embedder.py — pluggable sentence embedder (PyTorch or ONNX Runtime)
+#
+# EMBEDDER_BACKEND selects the implementation:
+#   torch      SentenceTransformer (default)
+#   onnx       all-MiniLM-L6-v2 exported to ONNX, run with onnxruntime
+#   onnx-int8  same, with dynamically int8-quantized weights
+#
+# The ONNX path reproduces the SentenceTransformer pipeline (mean pooling over
+# the attention mask, then L2 normalization) without importing torch.
+# Export once (needs torch + transformers, only at export time):
+#   python -m rag.embedder --export [--quantize]
+
+import os
+import sys
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "torch")
+# backend/models/onnx regardless of the working directory: the servers run from
+# backend/, build_index.py and the root rag_server.py from the repo root
+ONNX_DIR = os.getenv("ONNX_MODEL_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "onnx")
+MAX_LENGTH = 256  # all-MiniLM-L6-v2 max_seq_length
+
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model-int8.onnx"
+
+
+class OnnxEmbedder:
+    """Drop-in for SentenceTransformer.encode backed by onnxruntime."""
+
+    def __init__(self, model_dir=ONNX_DIR, quantized=False, max_length=MAX_LENGTH, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        path = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"{path} not found; run `python -m rag.embedder --export"
+                f"{' --quantize' if quantized else ''}` first"
+            )
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = threads or int(os.getenv("EMBEDDER_THREADS", "0"))
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.quantized = quantized
+
+    def _encode_batch(self, texts):
+        import numpy as np
+
+        enc = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in enc], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in enc], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]  # (batch, seq, dim)
+        m = mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * m).sum(axis=1) / np.clip(m.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False,
+               convert_to_numpy=True, **kwargs):
+        import numpy as np
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        # batch similar lengths together to minimise padding, then restore order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            vecs = self._encode_batch([texts[i] for i in idx])
+            for i, v in zip(idx, vecs):
+                out[i] = v
+        result = np.stack(out).astype(np.float32)
+        return result[0] if single else result
+
+    @property
+    def dimension(self):
+        return self.session.get_outputs()[0].shape[-1] or 384
+
+
+def get_embedder(backend=None, model_name=EMBED_MODEL):
+    """Return an object with a SentenceTransformer-compatible encode()."""
+    backend = backend or EMBEDDER_BACKEND
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbedder(quantized=backend == "onnx-int8")
+    raise ValueError(f"Unknown EMBEDDER_BACKEND: {backend}")
+
+
+def export_onnx(model_name=EMBED_MODEL, out_dir=ONNX_DIR, quantize=False):
+    """Export the transformer of a SentenceTransformer model to ONNX."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    os.makedirs(out_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(hf_name)
+    model = AutoModel.from_pretrained(hf_name).eval()
+    tokenizer.save_pretrained(out_dir)  # writes tokenizer.json for `tokenizers`
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    path = os.path.join(out_dir, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in names),
+            path,
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14,
+        )
+    print("✓ Exported", path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        qpath = os.path.join(out_dir, ONNX_INT8_FILE)
+        quantize_dynamic(path, qpath, weight_type=QuantType.QInt8)
+        print("✓ Quantized", qpath)
+
+
+if __name__ == "__main__":
+    if "--export" not in sys.argv:
+        print("Usage: python -m rag.embedder --export [--quantize]")
+        sys.exit(1)
+    export_onnx(quantize="--quantize" in sys.argv)
@@ -1,41 +1,44 @@
 import os
-import google.generativeai as genai
-import chromadb
-from sentence_transformers import SentenceTransformer
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
+import metrics
+from responses import CompressionMiddleware, FastJSONResponse
+import runtime_config
+from metrics import stage
+from shared_models import models
+from rag.context import assemble_context, estimate_tokens
+
+runtime_config.configure()
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-
-app = FastAPI()
 
-# CORS for frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+_genai = None
 
-# Embedding Model
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+def get_genai():
+    """Import and configure google.generativeai on first use."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=GEMINI_API_KEY)
+        _genai = genai
+    return _genai
 
-# Chroma vector DB
-collection = chromadb.Client().get_collection("hdmc_rag")
+router = APIRouter()
 
 class QueryIn(BaseModel):
     question: str
     top_k: int = 3
 
 def retrieve_context(question, top_k):
-    q_emb = embedder.encode([question])[0].tolist()
-    r = collection.query(query_embeddings=[q_emb], n_results=top_k)
+    with stage("embed"):
+        q_emb = models.embedder.encode([question])[0].tolist()
+    with stage("vector_query"):
+        r = models.collection.query(query_embeddings=[q_emb], n_results=top_k)
 
     docs = []
     for i in range(len(r["ids"][0])):
@@ -46,8 +49,8 @@ def retrieve_context(question, top_k):
         })
     return docs
 
-def gemini_rag(context_text, question):
-    prompt = f"""
+def build_prompt(context_text, question):
+    return f"""
 You are an expert municipal assistant for Hubli–Dharwad City.
 Use ONLY the context below to answer. 
 If incomplete, say: "Not enough information in local documents."
@@ -65,14 +68,42 @@ Respond with:
 4) Short explanation
 """
 
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    response = model.generate_content(prompt)
+def gemini_rag(prompt):
+    model = get_genai().GenerativeModel("gemini-2.0-flash")
+    with stage("generate"):
+        response = model.generate_content(prompt)
     return response.text.strip()
 
-@app.post("/rag_query")
+@router.post("/rag_query")
 def rag_query(q: QueryIn):
     docs = retrieve_context(q.question, q.top_k)
-    context = "\n\n".join([f"[{d['source']}]\n{d['text']}" for d in docs])
-    answer = gemini_rag(context, q.question)
+    with stage("context"):
+        context, stats = assemble_context(docs, embedder=models.embedder, with_sources=True)
+    prompt = build_prompt(context, q.question)
+    answer = gemini_rag(prompt)
+
+    return {"answer": answer, "retrieved": docs,
+            "prompt_tokens": estimate_tokens(prompt), "context": stats}
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
+# CORS for frontend
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(router)
+app.include_router(metrics.router)
 
-    return {"answer": answer, "retrieved": docs}
\ No newline at end of file
+# Embedding model + Chroma vector DB, loaded when this app starts (not on
+# import, so unified_server can mount the router without side effects)
+@app.on_event("startup")
+def load_models():
+    models.load_all(classifiers=False)
+    get_genai()
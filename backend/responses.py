@@ -0,0 +1,151 @@
+# responses.py — fast JSON rendering and negotiated response compression
+#
+# FastJSONResponse serializes with orjson (numpy arrays/scalars natively,
+# pandas DataFrames straight from DataFrame.to_json) and falls back to the
+# stdlib json module when orjson is not installed. Returning it from an
+# endpoint also skips FastAPI's jsonable_encoder pass.
+#
+# CompressionMiddleware gzip- or brotli-encodes JSON/NDJSON/text responses
+# larger than COMPRESS_MIN_BYTES, following the client's Accept-Encoding.
+# Streaming responses are compressed chunk by chunk, each flushed as it is sent.
+
+import json
+import os
+import zlib
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+COMPRESSIBLE = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+def _default(obj):
+    """Types orjson/json do not handle natively: pandas objects and numpy scalars."""
+    if hasattr(obj, "to_json") and hasattr(obj, "columns"):  # DataFrame
+        raw = obj.to_json(orient="records", double_precision=15)
+        return orjson.Fragment(raw) if orjson is not None and hasattr(orjson, "Fragment") else json.loads(raw)
+    if hasattr(obj, "to_list"):  # Series / Index
+        return obj.to_list()
+    if hasattr(obj, "tolist"):  # numpy scalars and arrays
+        return obj.tolist()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+else:
+    def dumps(obj):
+        return json.dumps(obj, default=_default, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+# ------------------------------------------------------
+# COMPRESSION
+# ------------------------------------------------------
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header (q=0 excludes a coding)."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip()] = q
+    for name in (("br", "gzip") if brotli is not None else ("gzip",)):
+        if offered.get(name, offered.get("*", 0)) > 0:
+            return name
+    return None
+
+
+def _compressor(encoding):
+    """(compress, sync, finish): sync flushes everything compressed so far."""
+    if encoding == "br":
+        c = brotli.Compressor(quality=BROTLI_QUALITY)
+        return c.process, c.flush, c.finish
+    c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    return c.compress, lambda: c.flush(zlib.Z_SYNC_FLUSH), c.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = choose_encoding(accept) if accept else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        state = {"start": None, "compress": None, "sync": None, "flush": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = dict((k.lower(), v) for k, v in message.get("headers", []))
+                ctype = headers.get(b"content-type", b"")
+                if b"content-encoding" in headers or not ctype.startswith(COMPRESSIBLE):
+                    state["start"] = False
+                    await send(message)
+                else:
+                    state["start"] = message  # held until the first body chunk
+                return
+
+            if message["type"] != "http.response.body" or state["start"] is False:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if state["compress"] is None:
+                start = state["start"]
+                if not more and len(body) < self.minimum_size:
+                    await send(start)
+                    await send(message)
+                    state["start"] = False
+                    return
+                state["compress"], state["sync"], state["flush"] = _compressor(encoding)
+                headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more:
+                    # whole body in one message: compress it and send a real length
+                    out = state["compress"](body) + state["flush"]()
+                    headers.append((b"content-length", str(len(out)).encode()))
+                    await send({**start, "headers": headers})
+                    await send({"type": "http.response.body", "body": out})
+                    return
+                await send({**start, "headers": headers})
+
+            # flush each streamed chunk so the client gets it now, not when
+            # the compressor's buffer happens to fill
+            out = state["compress"](body) + (state["sync"]() if more else state["flush"]())
+            await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,102 @@
+# roboflow_client.py — pooled async client for the Roboflow detection API
+#
+# One keep-alive connection pool per process, explicit timeouts and retries
+# with backoff on connection errors / 5xx. Point ROBOFLOW_URL at a local stub
+# (see stub_detector.py) to run without the real API.
+
+import asyncio
+import os
+
+import httpx
+
+ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
+PROJECT = "civic-issue"
+WORKSPACE = "beshu"
+VERSION = 1   # your Roboflow version
+
+ROBOFLOW_URL = os.getenv("ROBOFLOW_URL", f"https://detect.roboflow.com/{PROJECT}/{VERSION}")
+
+TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=30.0, pool=5.0)
+LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=30.0)
+RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DetectionError(Exception):
+    pass
+
+
+class RoboflowClient:
+    def __init__(self, url=ROBOFLOW_URL, api_key=ROBOFLOW_API_KEY, retries=RETRIES):
+        self.url = url
+        self.api_key = api_key
+        self.retries = retries
+        self._client = None
+
+    def _http(self):
+        if self._client is None:
+            # connect-level retries are handled by the transport; status retries below
+            self._client = httpx.AsyncClient(
+                timeout=TIMEOUT,
+                limits=LIMITS,
+                transport=httpx.AsyncHTTPTransport(retries=1, limits=LIMITS),
+            )
+        return self._client
+
+    async def detect(self, image_bytes, filename="image.jpg", content_type="image/jpeg"):
+        """Return the list of predictions for one image (single remote call)."""
+        params = {"format": "json"}  # the API's default confidence, as before
+        if self.api_key:
+            params["api_key"] = self.api_key
+
+        delay = 0.5
+        for attempt in range(self.retries):
+            try:
+                resp = await self._http().post(
+                    self.url,
+                    params=params,
+                    files={"file": (filename, image_bytes, content_type)},
+                )
+                if resp.status_code in RETRY_STATUSES and attempt < self.retries - 1:
+                    raise DetectionError(f"detector returned {resp.status_code}")
+                resp.raise_for_status()
+                try:
+                    body = resp.json()
+                except ValueError as e:  # e.g. an HTML error page from a proxy
+                    raise DetectionError("detector returned a non-JSON response") from e
+                if not isinstance(body, dict):
+                    raise DetectionError("detector returned an unexpected response")
+                return body.get("predictions", [])
+            except (httpx.TransportError, DetectionError) as e:
+                if attempt == self.retries - 1:
+                    raise DetectionError(str(e)) from e
+                await asyncio.sleep(delay)
+                delay *= 2
+            except httpx.HTTPStatusError as e:
+                raise DetectionError(f"detector returned {e.response.status_code}") from e
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def render_boxes(image, predictions):
+    """Draw prediction boxes (Roboflow centre/size format) onto a PIL image copy."""
+    from PIL import ImageDraw
+
+    out = image.convert("RGB")
+    draw = ImageDraw.Draw(out)
+    line = max(2, round(min(out.size) / 200))
+    for p in predictions:
+        x0 = p["x"] - p["width"] / 2
+        y0 = p["y"] - p["height"] / 2
+        x1 = p["x"] + p["width"] / 2
+        y1 = p["y"] + p["height"] / 2
+        draw.rectangle([x0, y0, x1, y1], outline=(0, 255, 0), width=line)
+        label = f"{p.get('class', '')} {p.get('confidence', 0):.2f}"
+        tx, ty = x0, max(0, y0 - 12)
+        tw = draw.textlength(label)
+        draw.rectangle([tx, ty, tx + tw + 4, ty + 12], fill=(0, 255, 0))
+        draw.text((tx + 2, ty), label, fill=(0, 0, 0))
+    return out
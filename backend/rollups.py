@@ -0,0 +1,207 @@
+# rollups.py — pre-aggregated daily counts for the analytics dashboards
+#
+# Every complaint bumps one tiny document in `daily_counts`, keyed by
+# (date, category, area, urgency). Dashboards read those instead of
+# scanning the raw `complaints` collection. Repeat reports of a known
+# incident (stored with duplicate=True) are not counted, so the counts are
+# distinct incidents.
+#
+# Backfill (rebuilds daily_counts from complaints, up to yesterday):
+#   python rollups.py --backfill [YYYY-MM-DD] [--include-today]
+
+import os
+import sys
+from datetime import datetime
+
+ROLLUP_COLLECTION = "daily_counts"
+ROLLUP_KEY = ["date", "category", "area", "urgency"]
+UNKNOWN = "Unknown"
+
+
+def rollup_key(doc):
+    """Return the daily_counts key for a complaint document."""
+    date = doc.get("date")
+    if not date:
+        ts = doc.get("timestamp")
+        if isinstance(ts, datetime):
+            date = ts.strftime("%Y-%m-%d")
+        elif isinstance(ts, str) and len(ts) >= 10:
+            date = ts[:10]
+        else:
+            date = datetime.utcnow().strftime("%Y-%m-%d")
+    return {
+        "date": date,
+        "category": doc.get("category") or UNKNOWN,
+        "area": doc.get("area") or UNKNOWN,
+        "urgency": doc.get("urgency") or UNKNOWN,
+    }
+
+
+async def ensure_indexes(db):
+    # unique key is required by $merge and keeps upserts race-free
+    await db[ROLLUP_COLLECTION].create_index([(k, 1) for k in ROLLUP_KEY], unique=True)
+    await db[ROLLUP_COLLECTION].create_index([("date", 1), ("category", 1)])
+
+
+async def record_complaint(db, doc, n=1):
+    """Increment the rollup bucket for one complaint."""
+    if doc.get("duplicate"):
+        return
+    await db[ROLLUP_COLLECTION].update_one(
+        rollup_key(doc), {"$inc": {"count": n}}, upsert=True
+    )
+
+
+async def record_complaints(db, docs):
+    """Increment rollup buckets for a batch of complaints in one round trip."""
+    from pymongo import UpdateOne
+
+    counts = {}
+    for doc in docs:
+        if doc.get("duplicate"):
+            continue
+        key = tuple(rollup_key(doc).items())
+        counts[key] = counts.get(key, 0) + 1
+    if not counts:
+        return
+    ops = [
+        UpdateOne(dict(key), {"$inc": {"count": n}}, upsert=True)
+        for key, n in counts.items()
+    ]
+    await db[ROLLUP_COLLECTION].bulk_write(ops, ordered=False)
+
+
+async def insert_complaint(db, doc):
+    """Store a complaint and keep daily_counts in step with it."""
+    doc = dict(doc)
+    doc.update({k: v for k, v in rollup_key(doc).items() if not doc.get(k)})
+    result = await db["complaints"].insert_one(doc)
+    await record_complaint(db, doc)
+    return result.inserted_id
+
+
+def _or_unknown(expr):
+    """Pipeline twin of `doc.get(x) or UNKNOWN`: missing, null and "" -> Unknown."""
+    return {"$cond": [{"$eq": [{"$ifNull": [expr, ""]}, ""]}, UNKNOWN, expr]}
+
+
+# Pipeline twin of rollup_key's date: `date` if set, else the first 10 chars
+# of `timestamp` (datetime or ISO string). rollup_key falls back to today for
+# live inserts; a stored complaint with neither is counted under Unknown.
+ROLLUP_DATE = {"$switch": {
+    "branches": [
+        {"case": {"$ne": [{"$ifNull": ["$date", ""]}, ""]}, "then": "$date"},
+        {"case": {"$eq": [{"$type": "$timestamp"}, "date"]},
+         "then": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}},
+        {"case": {"$and": [{"$eq": [{"$type": "$timestamp"}, "string"]},
+                           {"$gte": [{"$strLenCP": "$timestamp"}, 10]}]},
+         "then": {"$substrCP": ["$timestamp", 0, 10]}},
+    ],
+    "default": UNKNOWN,
+}}
+
+
+async def backfill(db, since=None, include_today=False):
+    """
+    Recompute daily_counts from the raw complaints collection.
+    Runs entirely server-side ($group + $merge), so it is safe to run on
+    large collections and idempotent when re-run.
+
+    $merge replaces whole buckets, so a live $inc landing on a bucket while
+    the pipeline runs can be overwritten. Live complaints go to today's
+    bucket, so today is left alone unless include_today is set (only do that
+    with writes paused); don't import historical complaints during a backfill.
+    """
+    await ensure_indexes(db)
+    date_range = {}
+    if since:
+        date_range["$gte"] = since
+    if not include_today:
+        date_range["$lt"] = datetime.utcnow().strftime("%Y-%m-%d")
+    pipeline = [
+        # same rule and bucket as the live path: repeat reports are skipped
+        {"$match": {"duplicate": {"$ne": True}}},
+        {"$project": {
+            "_id": 0,
+            "date": ROLLUP_DATE,
+            "category": _or_unknown("$category"),
+            "area": _or_unknown("$area"),
+            "urgency": _or_unknown("$urgency"),
+        }},
+        # "Unknown" sorts after every YYYY-MM-DD: only rebuilt with include_today
+        {"$match": {"date": date_range} if date_range else {}},
+        {"$group": {
+            "_id": {k: f"${k}" for k in ROLLUP_KEY},
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "date": "$_id.date",
+            "category": "$_id.category",
+            "area": "$_id.area",
+            "urgency": "$_id.urgency",
+            "count": 1,
+        }},
+        {"$merge": {
+            "into": ROLLUP_COLLECTION,
+            "on": ROLLUP_KEY,
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+    # $merge produces no output documents; iterating runs the pipeline
+    async for _ in db["complaints"].aggregate(pipeline, allowDiskUse=True):
+        pass
+
+
+async def daily_counts(db, dates, categories=None):
+    """
+    Return {(date, category): count} for the given dates, summed over
+    area and urgency.
+    """
+    match = {"date": {"$in": list(dates)}}
+    if categories:
+        match["category"] = {"$in": list(categories)}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"date": "$date", "category": "$category"},
+            "count": {"$sum": "$count"},
+        }},
+    ]
+    out = {}
+    async for r in db[ROLLUP_COLLECTION].aggregate(pipeline):
+        out[(r["_id"]["date"], r["_id"]["category"])] = r["count"]
+    return out
+
+
+async def summary(db, since, group_by="category"):
+    """Return [{group_by: value, count: n}] for rollups on or after `since`."""
+    pipeline = [
+        {"$match": {"date": {"$gte": since}}},
+        {"$group": {"_id": f"${group_by}", "count": {"$sum": "$count"}}},
+        {"$sort": {"count": -1}},
+    ]
+    return [
+        {group_by: r["_id"], "count": r["count"]}
+        async for r in db[ROLLUP_COLLECTION].aggregate(pipeline)
+    ]
+
+
+if __name__ == "__main__":
+    import asyncio
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    if "--backfill" not in sys.argv:
+        print("Usage: python rollups.py --backfill [YYYY-MM-DD] [--include-today]")
+        sys.exit(1)
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    since = args[0] if args else None
+    include_today = "--include-today" in sys.argv
+
+    client = AsyncIOMotorClient(os.getenv("MONGO_URI"))
+    print("Backfilling", ROLLUP_COLLECTION, "since", since or "the beginning",
+          "including today" if include_today else "up to yesterday")
+    asyncio.run(backfill(client["civic_db"], since, include_today))
+    print("✓ Backfill complete")
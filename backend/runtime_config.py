@@ -0,0 +1,198 @@
+# runtime_config.py — per-worker CPU thread budget for inference
+#
+# With several uvicorn workers on one box, every PyTorch/BLAS/ONNX runtime
+# otherwise grabs all cores and the workers fight each other. configure()
+# splits the cores between workers and must run before numpy/torch are
+# imported (servers call it first thing; heavy imports are lazy).
+#
+#   WORKERS / WEB_CONCURRENCY  number of worker processes on this box (default 1)
+#   INFERENCE_THREADS          threads per worker (default OMP_NUM_THREADS if set,
+#                              else cores // workers)
+#   PIN_WORKERS=1              pin each worker to its own slice of cores; needs the
+#                              worker's index, so only unified_server.py pre-fork
+#                              workers (and the bench) are pinned, not uvicorn --workers
+#
+# Thread variables already set in the environment (e.g. OMP_NUM_THREADS=2) are
+# left as they are.
+#
+# Sweep thread/worker combinations and report /analyze throughput and p99:
+#   python runtime_config.py --bench [--requests 200] [--workers 1,2,4]
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+THREAD_ENV_VARS = [
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "EMBEDDER_THREADS",  # onnxruntime intra-op threads, see rag/embedder.py
+]
+
+settings = {"threads": None, "workers": None, "cores": None, "pinned": None}
+
+# What the user set, before configure() writes its own values. Values written by
+# configure() in a parent process are inherited by children; _CONFIGURED_VARS
+# lists them so a child does not mistake them for user settings.
+_CONFIGURED_VARS = "RUNTIME_CONFIG_VARS"
+_inherited = set(os.getenv(_CONFIGURED_VARS, "").split(","))
+_user_env = {var: os.environ[var] for var in THREAD_ENV_VARS
+             if var in os.environ and var not in _inherited}
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def configure(workers=None, threads=None, worker_index=None, pin=None):
+    """Set thread-count env vars for this process; returns the settings used."""
+    cores = available_cores()
+    workers = workers or int(os.getenv("WORKERS") or os.getenv("WEB_CONCURRENCY") or 1)
+    user_omp = _user_env.get("OMP_NUM_THREADS", "")
+    threads = (threads or int(os.getenv("INFERENCE_THREADS") or 0)
+               or (int(user_omp) if user_omp.isdigit() else 0) or max(1, cores // workers))
+    pin = pin if pin is not None else os.getenv("PIN_WORKERS") == "1"
+
+    for var in THREAD_ENV_VARS:
+        if var not in _user_env:
+            os.environ[var] = str(threads)
+    os.environ[_CONFIGURED_VARS] = ",".join(v for v in THREAD_ENV_VARS if v not in _user_env)
+    # the HF tokenizer spawns its own pool per call; keep it off with several workers
+    os.environ["TOKENIZERS_PARALLELISM"] = "true" if workers == 1 else "false"
+
+    pinned = None
+    if pin and worker_index is not None and hasattr(os, "sched_setaffinity"):
+        all_cores = sorted(os.sched_getaffinity(0))
+        start = (worker_index * threads) % len(all_cores)
+        pinned = [all_cores[(start + i) % len(all_cores)] for i in range(threads)]
+        os.sched_setaffinity(0, pinned)
+
+    settings.update(threads=threads, workers=workers, cores=cores, pinned=pinned)
+    if "torch" in sys.modules:
+        apply_torch()
+    return dict(settings)
+
+
+def apply_torch():
+    """Apply the thread budget to torch (call after importing it)."""
+    import torch
+
+    threads = settings["threads"] or int(os.getenv("OMP_NUM_THREADS", "0")) or None
+    if threads:
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # can only be set before the first parallel op
+
+
+# ------------------------------------------------------
+# BENCHMARK MODE
+# ------------------------------------------------------
+def _percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, int(round(p / 100 * (len(values) - 1)))))
+    return values[k]
+
+
+def _bench_child(n, worker_index):
+    """Run /analyze n times in-process and print latencies (ms) as JSON."""
+    configure(worker_index=worker_index)
+    import combined_server
+    from benchmarks import synthetic
+    from incident_index import IncidentIndex
+    from shared_models import models
+
+    models.warm_up()
+    # unique texts per worker, and a fresh incident index per request: repeats
+    # would take the duplicate path and skip classification, RAG and the LLM
+    texts = [c["ComplaintText"] for c in synthetic.complaints(n, seed=100 + worker_index)]
+
+    async def run():
+        latencies = []
+        for text in texts:
+            combined_server.incidents = IncidentIndex()
+            req = combined_server.TextRequest(text=text)
+            t0 = time.perf_counter()
+            await combined_server.analyze(req)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        return latencies
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def bench(worker_counts, thread_counts, n):
+    import tempfile
+
+    cores = available_cores()
+    results = []
+    tmp = tempfile.mkdtemp(prefix="bench_threads_")
+    for workers in worker_counts:
+        for threads in thread_counts:
+            env = dict(os.environ, WORKERS=str(workers), INFERENCE_THREADS=str(threads))
+            for var in THREAD_ENV_VARS:
+                env.pop(var, None)  # the sweep sets the thread count, not the caller's env
+            env.pop("GEMINI_API_KEY", None)  # measure local stages, not the remote LLM
+            # analyzed complaints are persisted; keep them out of the real store
+            env.update(COMPLAINT_STORE="sqlite",
+                       COMPLAINT_DB=os.path.join(tmp, f"w{workers}-t{threads}.db"))
+            t0 = time.perf_counter()
+            procs = [
+                subprocess.Popen(
+                    [sys.executable, __file__, "--bench-child", str(n), str(i)],
+                    env=env, stdout=subprocess.PIPE, text=True,
+                )
+                for i in range(workers)
+            ]
+            latencies = []
+            for p in procs:
+                out, _ = p.communicate()
+                latencies += json.loads(out.strip().splitlines()[-1])
+            elapsed = time.perf_counter() - t0  # includes warm-up; compare configs, not absolutes
+            row = {
+                "workers": workers,
+                "threads": threads,
+                "oversubscription": round(workers * threads / cores, 2),
+                "requests": len(latencies),
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(_percentile(latencies, 50), 1),
+                "p99_ms": round(_percentile(latencies, 99), 1),
+            }
+            results.append(row)
+            print(f"workers={workers} threads={threads:<2d} "
+                  f"{row['throughput_rps']:7.1f} req/s  p50 {row['p50_ms']:7.1f} ms  p99 {row['p99_ms']:7.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 4 and sys.argv[1] == "--bench-child":
+        _bench_child(int(sys.argv[2]), int(sys.argv[3]))
+    elif "--bench" in sys.argv:
+        import argparse
+
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--bench", action="store_true")
+        parser.add_argument("--requests", type=int, default=200, help="requests per worker")
+        parser.add_argument("--workers", default="1,2,4")
+        parser.add_argument("--threads", default=None, help="default: 1,2,...,cores")
+        args = parser.parse_args()
+
+        cores = available_cores()
+        thread_counts = ([int(t) for t in args.threads.split(",")] if args.threads
+                         else sorted({1, 2, max(1, cores // 2), cores}))
+        print(f"{cores} cores available")
+        results = bench([int(w) for w in args.workers.split(",")], thread_counts, args.requests)
+        with open("bench_threads.json", "w") as f:
+            json.dump({"cores": cores, "results": results}, f, indent=2)
+        print("✓ Results written to bench_threads.json")
+    else:
+        print(json.dumps(configure(), indent=2))
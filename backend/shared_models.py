@@ -0,0 +1,161 @@
+# shared_models.py — one copy of every model per process
+#
+# rag_server, predict_server and combined_server all read their models from
+# `models` instead of loading their own, so the unified host (unified_server.py)
+# holds a single SentenceTransformer and one set of joblib classifiers.
+# Everything loads on first access; call models.load_all() to load up front,
+# or load_before_fork() in a pre-fork parent so workers share the weights
+# copy-on-write.
+
+import os
+import sys
+import threading
+import time
+
+import metrics
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma")
+COLLECTION_NAME = "hdmc_rag"
+JOBLIB_FILES = {
+    "vectorizer": "vectorizer.pkl",
+    "cat_model": "category_model.pkl",
+    "urg_model": "urgency_model.pkl",
+}
+
+
+class ModelContainer:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = {}
+        self.errors = {}
+        self.versions = {}
+
+    def _get(self, name, loader):
+        value = self._loaded.get(name)
+        if value is not None:
+            return value
+        with self._lock:
+            if name not in self._loaded:
+                with metrics.stage(f"load_{name}"):
+                    self._loaded[name] = loader()
+                self.versions[name] = self._version(name)
+                metrics.set_model_info(name, self.versions[name])
+            return self._loaded[name]
+
+    def _version(self, name):
+        """Label for /metrics: file mtime for pickles, model + backend for the embedder."""
+        if name in JOBLIB_FILES:
+            path = os.path.join(MODEL_DIR, JOBLIB_FILES[name])
+            return time.strftime("%Y%m%d-%H%M%S", time.gmtime(os.path.getmtime(path)))
+        if name == "embedder":
+            return f"{EMBED_MODEL}/{os.getenv('EMBEDDER_BACKEND', 'torch')}"
+        if name == "collection":
+            return f"{COLLECTION_NAME}/{self._loaded[name].count()}"
+        return "unknown"
+
+    # --- classifiers ---
+    @property
+    def vectorizer(self):
+        return self._get("vectorizer", lambda: self._joblib("vectorizer"))
+
+    @property
+    def cat_model(self):
+        return self._get("cat_model", lambda: self._joblib("cat_model"))
+
+    @property
+    def urg_model(self):
+        return self._get("urg_model", lambda: self._joblib("urg_model"))
+
+    def _joblib(self, name):
+        import joblib
+
+        return joblib.load(os.path.join(MODEL_DIR, JOBLIB_FILES[name]))
+
+    # --- RAG ---
+    @property
+    def embedder(self):
+        def load():
+            import runtime_config
+            from rag.embedder import get_embedder  # EMBEDDER_BACKEND: torch | onnx | onnx-int8
+
+            embedder = get_embedder(model_name=EMBED_MODEL)
+            if "torch" in sys.modules:
+                runtime_config.apply_torch()
+            return embedder
+
+        return self._get("embedder", load)
+
+    @property
+    def collection(self):
+        def load():
+            import chromadb
+
+            return chromadb.PersistentClient(path=CHROMA_PATH).get_collection(COLLECTION_NAME)
+
+        return self._get("collection", load)
+
+    @property
+    def rag_available(self):
+        """True if the embedder and vector collection can be loaded."""
+        if "rag" in self.errors:
+            return False
+        try:
+            self.embedder
+            self.collection
+            return True
+        except Exception as e:
+            print(f"WARNING: RAG components not available: {e}")
+            self.errors["rag"] = str(e)
+            return False
+
+    def load_all(self, classifiers=True, rag=True):
+        """Load models now; failures are recorded, not raised."""
+        if classifiers:
+            for name in ("vectorizer", "cat_model", "urg_model"):
+                try:
+                    getattr(self, name)
+                except Exception as e:
+                    print(f"WARNING: could not load {name}: {e}")
+                    self.errors[name] = str(e)
+        if rag:
+            self.rag_available
+        return self
+
+    def load_before_fork(self):
+        """Load what forked workers can share: the classifiers and, with the torch
+        backend, the embedder weights.
+
+        Nothing is run, so torch has not started its intra-op pool (and it
+        builds a fresh one in a forked child anyway). onnxruntime starts its
+        threads when the session is created and Chroma holds a SQLite
+        connection, so those are opened by each worker after the fork.
+        """
+        self.load_all(rag=False)
+        if os.getenv("EMBEDDER_BACKEND", "torch") == "torch":
+            try:
+                self.embedder
+            except Exception as e:
+                print(f"WARNING: could not load embedder: {e}")  # workers retry after the fork
+        return self
+
+    def warm_up(self, classifiers=True, rag=True):
+        """Load models and run one dummy inference so the first request is not slow."""
+        self.load_all(classifiers=classifiers, rag=rag)
+        try:
+            if classifiers and not self.errors.keys() & {"vectorizer", "cat_model", "urg_model"}:
+                X = self.vectorizer.transform(["warm up"])
+                self.cat_model.predict(X)
+                self.urg_model.predict(X)
+            if rag and self.rag_available:
+                self.embedder.encode(["warm up"])
+        except Exception as e:
+            print(f"WARNING: model warm-up failed: {e}")
+        return self
+
+    def loaded(self):
+        return sorted(self._loaded)
+
+
+models = ModelContainer()
@@ -1,15 +1,54 @@
-# start_all_services.py
+# start_all_services.py — supervisor for the backend services
+#
+#   python start_all_services.py                   # all services, production settings
+#   python start_all_services.py --dev             # uvicorn --reload, one worker each
+#   python start_all_services.py --only combined --workers combined=4
+#
+# Services start in parallel and are reported ready once their readiness URL
+# answers 200, not after a fixed sleep. Child output is drained continuously
+# (a full pipe would otherwise block the child) into rotating files under
+# logs/ and echoed to the console with a service prefix. A child that exits
+# is restarted with exponential backoff; the other services keep running.
+
+import argparse
+import asyncio
+import logging
 import os
+import signal
 import sys
-import subprocess
 import time
+from logging.handlers import RotatingFileHandler
+
 from dotenv import load_dotenv
 
+# name: (uvicorn app, port, readiness path)
+# rag/predict load their models in a blocking startup hook, so any 200 means they are ready.
+SERVICES = {
+    "rag": ("rag_server:app", 8000, "/metrics"),
+    "predict": ("predict_server:app", 8001, "/metrics"),
+    "combined": ("combined_server:app", 8002, "/ready"),
+}
+
+HOST = os.getenv("SERVICE_HOST", "0.0.0.0")
+LOG_DIR = os.getenv("SERVICE_LOG_DIR", "logs")
+LOG_MAX_BYTES = int(os.getenv("SERVICE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("SERVICE_LOG_BACKUPS", "5"))
+READY_TIMEOUT_S = float(os.getenv("SERVICE_READY_TIMEOUT_S", "180"))
+STOP_TIMEOUT_S = 10.0
+MAX_BACKOFF_S = 60.0
+STABLE_AFTER_S = 60.0   # a child that ran this long resets its backoff
+MAX_FAILURES = 10       # consecutive quick crashes before giving up on a service
+DRAIN_CHUNK = 65536
+MAX_LINE_BYTES = 1024 * 1024
+
+
 def train_models():
     """Train the ML models"""
+    import subprocess
+
     print("Training ML models...")
     try:
-        result = subprocess.run([sys.executable, "train_classifier.py"], 
+        result = subprocess.run([sys.executable, "train_classifier.py", "--quick"],
                               capture_output=True, text=True, timeout=300)
         if result.returncode == 0:
             print("✓ Models trained successfully")
@@ -25,67 +64,183 @@ def train_models():
         print(f"✗ Error training models: {e}")
         return False
 
-def start_rag_service():
-    """Start the RAG service"""
-    print("Starting RAG service...")
-    try:
-        process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", 
-            "rag_server:app", "--reload", "--port", "8000"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        print("✓ RAG service started on http://localhost:8000")
-        return process
-    except Exception as e:
-        print(f"✗ Error starting RAG service: {e}")
-        return None
 
-def start_predict_service():
-    """Start the predict service"""
-    print("Starting predict service...")
-    try:
-        process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", 
-            "predict_server:app", "--reload", "--port", "8001"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        print("✓ Predict service started on http://localhost:8001")
-        return process
-    except Exception as e:
-        print(f"✗ Error starting predict service: {e}")
-        return None
+def _service_log(name):
+    logger = logging.getLogger(f"service.{name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = RotatingFileHandler(os.path.join(LOG_DIR, f"{name}.log"),
+                                  maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+class Service:
+    def __init__(self, name, app, port, ready_path, workers=1, dev=False, echo=True):
+        self.name = name
+        self.app = app
+        self.port = port
+        self.ready_path = ready_path
+        self.workers = workers
+        self.dev = dev
+        self.echo = echo
+        self.proc = None
+        self.restarts = 0
+        self.failures = 0
+        self.ready = False
+        self.log = _service_log(name)
+
+    def command(self):
+        cmd = [sys.executable, "-m", "uvicorn", self.app, "--host", HOST, "--port", str(self.port)]
+        if self.dev:
+            cmd.append("--reload")  # reload implies a single worker
+        elif self.workers > 1:
+            cmd += ["--workers", str(self.workers)]
+        return cmd
+
+    async def spawn(self):
+        env = dict(os.environ, WORKERS=str(self.workers), PYTHONUNBUFFERED="1")
+        self.proc = await asyncio.create_subprocess_exec(
+            *self.command(), env=env,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+        )
+        self.ready = False
+        asyncio.create_task(self._drain(self.proc))
+        asyncio.create_task(self._wait_ready(self.proc))
+
+    def _emit(self, line):
+        text = line.decode("utf8", "replace").rstrip()
+        self.log.info(text)
+        if self.echo:
+            print(f"[{self.name}] {text}", flush=True)
+
+    async def _drain(self, proc):
+        """Copy child output to the log file (and console) as it arrives."""
+        # read() rather than readline(): the StreamReader line limit (64 KiB)
+        # would kill this task on one long traceback or JSON log line, and a
+        # pipe nobody reads blocks the child
+        buf = b""
+        while True:
+            chunk = await proc.stdout.read(DRAIN_CHUNK)
+            if not chunk:
+                break
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                self._emit(line)
+            if len(buf) > MAX_LINE_BYTES:  # no newline in sight; log what we have
+                self._emit(buf)
+                buf = b""
+        if buf:
+            self._emit(buf)
+
+    async def _wait_ready(self, proc):
+        import httpx
+
+        url = f"http://127.0.0.1:{self.port}{self.ready_path}"
+        t0 = time.monotonic()
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            while proc.returncode is None and time.monotonic() - t0 < READY_TIMEOUT_S:
+                try:
+                    if (await client.get(url)).status_code == 200:
+                        self.ready = True
+                        print(f"✓ {self.name} ready on http://localhost:{self.port} "
+                              f"in {time.monotonic() - t0:.1f}s ({self.workers} worker(s))")
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.5)
+        if proc.returncode is None:
+            print(f"✗ {self.name} not ready after {READY_TIMEOUT_S:.0f}s; see {LOG_DIR}/{self.name}.log")
+
+    async def supervise(self, stopping):
+        """Run the service until `stopping` is set, restarting it when it exits."""
+        while not stopping.is_set():
+            started = time.monotonic()
+            await self.spawn()
+            code = await self.proc.wait()
+            if stopping.is_set():
+                return
+            ran = time.monotonic() - started
+            self.failures = 0 if ran >= STABLE_AFTER_S else self.failures + 1
+            if self.failures >= MAX_FAILURES:
+                print(f"✗ {self.name} crashed {self.failures} times in a row; giving up on it")
+                return
+            delay = min(MAX_BACKOFF_S, 2 ** max(self.failures - 1, 0))
+            self.restarts += 1
+            print(f"✗ {self.name} exited with code {code} after {ran:.0f}s; "
+                  f"restarting in {delay:.0f}s (restart #{self.restarts})")
+            try:
+                await asyncio.wait_for(stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        if self.proc is None or self.proc.returncode is not None:
+            return
+        self.proc.terminate()
+        try:
+            await asyncio.wait_for(self.proc.wait(), STOP_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
 
-def start_combined_service():
-    """Start the combined service"""
-    print("Starting combined service...")
+
+async def supervise(services):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C arrives as KeyboardInterrupt instead
+
+    tasks = [asyncio.create_task(s.supervise(stopping)) for s in services]
     try:
-        process = subprocess.Popen([
-            sys.executable, "-m", "uvicorn", 
-            "combined_server:app", "--reload", "--port", "8002"
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        
-        print("✓ Combined service started on http://localhost:8002")
-        return process
-    except Exception as e:
-        print(f"✗ Error starting combined service: {e}")
-        return None
+        await stopping.wait()
+    finally:
+        print("\nShutting down all services...")
+        stopping.set()
+        await asyncio.gather(*(s.stop() for s in services))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        print("All services stopped.")
+
+
+def parse_workers(spec, default):
+    """'combined=4,rag=2' -> {"combined": 4, "rag": 2, ...default for the rest}"""
+    workers = {name: default for name in SERVICES}
+    for part in filter(None, (spec or "").split(",")):
+        name, _, n = part.partition("=")
+        if name not in SERVICES or not n.isdigit():
+            raise SystemExit(f"--workers expects name=N with name in {list(SERVICES)}, got {part!r}")
+        workers[name] = int(n)
+    return workers
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Start and supervise the backend services")
+    parser.add_argument("--only", help=f"comma-separated subset of {','.join(SERVICES)}")
+    parser.add_argument("--workers", help="per-service worker counts, e.g. combined=4,rag=2")
+    parser.add_argument("--dev", action="store_true", help="uvicorn --reload, single worker")
+    parser.add_argument("--quiet", action="store_true", help="log to files only")
+    args = parser.parse_args()
+
     print("Hubli-Dharwad Municipal Corporation Backend Services")
     print("=" * 55)
-    
+
     # Load environment variables
     load_dotenv()
-    
+
     # Check if required files exist
     if not os.path.exists(".env"):
         print("✗ .env file not found. Please create one with your GEMINI_API_KEY.")
         return
-    
+
     if not os.path.exists("data/complaints_hdmc.csv"):
         print("✗ data/complaints_hdmc.csv not found. Please add your complaints data.")
         return
-    
+
     # Train models if not already trained
     if not os.path.exists("models/vectorizer.pkl"):
         if not train_models():
@@ -93,63 +248,21 @@ def main():
             return
     else:
         print("✓ ML models already trained")
-    
-    # Start all services
-    rag_process = start_rag_service()
-    if not rag_process:
-        print("Failed to start RAG service. Exiting.")
-        return
-    
-    # Wait a moment for the RAG service to start
-    time.sleep(2)
-    
-    predict_process = start_predict_service()
-    if not predict_process:
-        print("Failed to start predict service. Exiting.")
-        # Terminate the RAG process
-        rag_process.terminate()
-        return
-    
-    # Wait a moment for the predict service to start
-    time.sleep(2)
-    
-    combined_process = start_combined_service()
-    if not combined_process:
-        print("Failed to start combined service. Exiting.")
-        # Terminate the other processes
-        rag_process.terminate()
-        predict_process.terminate()
-        return
-    
-    print("\n" + "=" * 55)
-    print("All backend services are now running!")
-    print("RAG Service:     http://localhost:8000")
-    print("Predict Service: http://localhost:8001")
-    print("Combined Service: http://localhost:8002")
-    print("Press Ctrl+C to stop all services.")
-    
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    names = args.only.split(",") if args.only else list(SERVICES)
+    unknown = set(names) - set(SERVICES)
+    if unknown:
+        raise SystemExit(f"Unknown service(s): {', '.join(sorted(unknown))}")
+    workers = parse_workers(args.workers, int(os.getenv("SERVICE_WORKERS", "1")))
+    services = [Service(n, *SERVICES[n], workers=workers[n], dev=args.dev, echo=not args.quiet)
+                for n in names]
+
+    print(f"Starting {', '.join(names)} (logs in {LOG_DIR}/). Press Ctrl+C to stop all services.")
     try:
-        # Wait for all processes
-        while True:
-            if (rag_process.poll() is not None or 
-                predict_process.poll() is not None or 
-                combined_process.poll() is not None):
-                break
-            time.sleep(1)
+        asyncio.run(supervise(services))
     except KeyboardInterrupt:
-        print("\nShutting down all services...")
-        rag_process.terminate()
-        predict_process.terminate()
-        combined_process.terminate()
-        try:
-            rag_process.wait(timeout=10)
-            predict_process.wait(timeout=10)
-            combined_process.wait(timeout=10)
-        except subprocess.TimeoutExpired:
-            rag_process.kill()
-            predict_process.kill()
-            combined_process.kill()
-        print("All services stopped.")
+        pass
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
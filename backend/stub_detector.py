@@ -0,0 +1,44 @@
+# stub_detector.py — local stand-in for the Roboflow detection API
+#
+#   uvicorn stub_detector:app --port 9001
+#   ROBOFLOW_URL=http://127.0.0.1:9001/detect uvicorn yolo_server:app --port 8001
+#
+# Returns one deterministic box in the middle of the image, after an optional
+# artificial delay (STUB_DELAY_MS) to mimic remote latency.
+
+import asyncio
+import os
+from io import BytesIO
+
+from fastapi import FastAPI, UploadFile, File
+from PIL import Image
+
+app = FastAPI()
+
+STUB_DELAY_MS = float(os.getenv("STUB_DELAY_MS", "0"))
+calls = {"count": 0}
+
+
+@app.post("/detect")
+async def detect(file: UploadFile = File(...)):
+    calls["count"] += 1
+    data = await file.read()
+    w, h = Image.open(BytesIO(data)).size
+    if STUB_DELAY_MS:
+        await asyncio.sleep(STUB_DELAY_MS / 1000)
+    return {
+        "image": {"width": w, "height": h},
+        "predictions": [{
+            "x": w / 2,
+            "y": h / 2,
+            "width": w / 4,
+            "height": h / 4,
+            "class": "pothole",
+            "confidence": 0.9,
+        }],
+    }
+
+
+@app.get("/calls")
+def call_count():
+    return calls
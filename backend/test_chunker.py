@@ -0,0 +1,52 @@
+# test_chunker.py — rag/chunker.py spans: sizes, coverage, overlap and streaming
+#
+#   python -m pytest test_chunker.py
+
+import pytest
+
+from benchmarks import synthetic
+from rag.chunker import chunk_spans, iter_file_chunks
+
+TEXT = "\n\n".join(d["text"] for d in synthetic.corpus_documents(20))
+
+
+def _uncovered(text, spans):
+    covered = bytearray(len(text))
+    for s in spans:
+        covered[s.start:s.end] = b"\1" * (s.end - s.start)
+    return [i for i, c in enumerate(text) if not c.isspace() and not covered[i]]
+
+
+@pytest.mark.parametrize("unit,size,overlap", [("chars", 400, 80), ("tokens", 96, 16)])
+def test_spans_cover_text(unit, size, overlap):
+    spans = chunk_spans(TEXT, size, overlap, unit=unit)
+    assert spans and not _uncovered(TEXT, spans)
+    assert all(a.start < b.start for a, b in zip(spans, spans[1:]))
+    if unit == "chars":
+        assert max(s.end - s.start for s in spans) <= size
+
+
+def test_chunks_end_at_sentence_boundaries():
+    spans = chunk_spans(TEXT, 400, 80)
+    # synthetic sentences all end with "."; only the last chunk may be cut mid-sentence
+    assert all(s.text(TEXT).endswith(".") for s in spans[:-1])
+
+
+def test_adjacent_chunks_overlap():
+    spans = chunk_spans(TEXT, 400, 80)
+    assert all(b.start < a.end for a, b in zip(spans, spans[1:]))
+
+
+def test_streaming_matches_in_memory(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text(TEXT, encoding="utf8")
+    expected = chunk_spans(TEXT, 400, 80, source="corpus.txt")
+    for block in (257, 4096):
+        streamed = list(iter_file_chunks(path, "corpus.txt", 400, 80, block_chars=block))
+        assert [s for s, _ in streamed] == expected
+        assert all(chunk == s.text(TEXT) for s, chunk in streamed)
+
+
+def test_overlap_must_be_smaller_than_size():
+    with pytest.raises(ValueError):
+        chunk_spans(TEXT, 50, 50)
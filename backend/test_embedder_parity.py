@@ -0,0 +1,98 @@
+# test_embedder_parity.py — ONNX embedder must match the PyTorch embedder
+#
+#   python -m rag.embedder --export --quantize   # once
+#   python -m pytest test_embedder_parity.py -s  # parity (cosine >= 0.99)
+#   python test_embedder_parity.py               # parity + throughput benchmark
+
+import os
+import time
+
+import pytest
+
+from rag.embedder import ONNX_DIR, ONNX_FILE, ONNX_INT8_FILE, get_embedder
+
+MIN_COSINE = 0.99
+
+SENTENCES = [
+    "A big pothole near Gokul Road Market is causing traffic jams.",
+    "Garbage has not been collected in Vidyanagar for a week.",
+    "Street light not working near Unkal Lake since Monday.",
+    "Drainage overflow in Old Hubli near the market after heavy rain.",
+    "Water supply pipeline burst on Keshwapur main road.",
+    "Stray dogs attacking children near the school in Dharwad.",
+    "Who is responsible for clearing fallen trees after a storm?",
+    "short",
+    "The Hubli-Dharwad Municipal Corporation handles solid waste management, "
+    "road maintenance, street lighting and storm water drains across all wards.",
+]
+
+
+def _corpus(n=512):
+    base = SENTENCES * (n // len(SENTENCES) + 1)
+    return [f"{s} (report {i})" for i, s in enumerate(base[:n])]
+
+
+def _min_cosine(a, b):
+    # both sides are L2-normalized, so the dot product is the cosine
+    return float((a * b).sum(axis=1).min())
+
+
+def check_parity(backend):
+    torch_emb = get_embedder("torch").encode(SENTENCES, convert_to_numpy=True)
+    onnx_emb = get_embedder(backend).encode(SENTENCES)
+    assert torch_emb.shape == onnx_emb.shape
+    return _min_cosine(torch_emb, onnx_emb)
+
+
+def _require(model_file):
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("sentence_transformers")  # the torch reference
+    if not os.path.exists(os.path.join(ONNX_DIR, model_file)):
+        pytest.skip(f"{model_file} not exported; run python -m rag.embedder --export --quantize")
+
+
+def test_onnx_parity():
+    _require(ONNX_FILE)
+    cos = check_parity("onnx")
+    print(f"onnx min cosine vs torch: {cos:.5f}")
+    assert cos >= MIN_COSINE
+
+
+def test_onnx_int8_parity():
+    _require(ONNX_INT8_FILE)
+    cos = check_parity("onnx-int8")
+    print(f"onnx-int8 min cosine vs torch: {cos:.5f}")
+    assert cos >= MIN_COSINE
+
+
+def benchmark(backends=("torch", "onnx", "onnx-int8"), n=512, batch_size=32):
+    texts = _corpus(n)
+    results = {}
+    for backend in backends:
+        try:
+            emb = get_embedder(backend)
+        except Exception as e:
+            print(f"✗ {backend}: {e}")
+            continue
+        emb.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+        t0 = time.perf_counter()
+        emb.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for s in SENTENCES * 5:
+            emb.encode([s])
+        single_ms = (time.perf_counter() - t0) / (len(SENTENCES) * 5) * 1000
+
+        results[backend] = {"texts_per_sec": round(n / elapsed, 1), "single_query_ms": round(single_ms, 2)}
+        print(f"✓ {backend:10s} {n / elapsed:8.1f} texts/s   {single_ms:6.2f} ms/query")
+    return results
+
+
+if __name__ == "__main__":
+    for backend in ("onnx", "onnx-int8"):
+        try:
+            print(f"{backend}: min cosine vs torch = {check_parity(backend):.5f}")
+        except FileNotFoundError as e:
+            print(f"✗ {backend}: {e}")
+    benchmark()
@@ -0,0 +1,123 @@
+# test_hotspot_engine.py — windows, decay ranking, expiry and the store feed
+#
+#   python -m pytest test_hotspot_engine.py
+
+import asyncio
+
+import pytest
+
+from hotspot_engine import DAY, HOUR, HotspotEngine, HotspotSync, parse_window
+
+NOW = 1_900_000_000.0  # fixed clock, well in the future of any real data
+A = (15.3441, 75.1435)
+B = (15.3500, 75.1300)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr("hotspot_engine.time.time", lambda: NOW)
+    return HotspotEngine(half_life_h=24)
+
+
+def test_windows_count_only_recent_reports(engine):
+    engine.add(NOW - 2 * HOUR, *A, "Market", "High", "pothole")
+    engine.add(NOW - 3 * DAY, *A, "Market", "Low", "pothole again")
+    engine.add(NOW - 20 * DAY, *B, "Station", "Low", "old drain")
+
+    counts = {w: {h["area"]: h["count"] for h in engine.hotspots(w, now=NOW)}
+              for w in ("24h", "7d", "30d")}
+    assert counts["24h"] == {"Market": 1}
+    assert counts["7d"] == {"Market": 2}
+    assert counts["30d"] == {"Market": 2, "Station": 1}
+
+    market = engine.hotspots("7d", now=NOW)[0]
+    assert market["avg_urgency_score"] == 2.0 and market["avg_urgency_label"] == "Medium"
+    assert market["sample_text"] == "pothole"  # the latest report
+
+
+def test_recent_reports_outrank_old_ones(engine):
+    for _ in range(5):
+        engine.add(NOW - 25 * DAY, *B, "Station", "High", "old")
+    engine.add(NOW - HOUR, *A, "Market", "Medium", "new")
+    ranked = engine.hotspots("30d", now=NOW)
+    assert [h["area"] for h in ranked] == ["Market", "Station"]
+    assert ranked[1]["count"] == 5
+
+
+def test_old_cells_expire(engine):
+    engine.add(NOW - 10 * DAY, *A, "Market", "Low", "x")
+    assert engine.hotspots("30d", now=NOW + 15 * DAY)
+    assert engine.hotspots("30d", now=NOW + 40 * DAY) == []
+    assert not engine.cells
+
+
+def test_ring_slots_are_reused(engine):
+    # 40 days of daily reports keep one cell with a fixed number of slots
+    for d in range(40):
+        engine.add(NOW - d * DAY, *A, "Market", "Low", "x")
+    cell = next(iter(engine.cells.values()))
+    assert len(cell.daily.epoch) == 31
+    assert engine.hotspots("30d", now=NOW)[0]["count"] == 30
+
+
+@pytest.mark.parametrize("window", ["", "7", "0d", "49h", "32d", "1w"])
+def test_bad_windows_are_rejected(window):
+    with pytest.raises(ValueError):
+        parse_window(window)
+
+
+class ChangesStore:
+    """Two rows per page in commit order, like the real stores' changes()."""
+
+    COMMIT_SKEW_S = 10.0
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.max_page = 0
+
+    def commit(self, id_, ts, committed_at, duplicate=False):
+        self.rows.append({"id": id_, "ts": ts, "committed_at": committed_at, "lat": A[0],
+                          "lng": A[1], "area": "Market", "urgency": "High", "text": str(id_),
+                          "duplicate": duplicate})
+
+    async def changes(self, fields, since=None, after=None, limit=None):
+        key = lambda r: (r["committed_at"], r["id"])
+        match = sorted((r for r in self.rows if (key(r) > after if after else r["committed_at"] >= since)),
+                       key=key)
+        page = match[:2]
+        self.max_page = max(self.max_page, len(page))
+        return page, (key(page[-1]) if len(match) > 2 else None)
+
+    async def page(self, fields, limit, **filters):
+        return self.rows[:limit], None
+
+
+def test_sync_reads_each_row_once(engine):
+    store = ChangesStore()
+    store.commit(1, NOW - 30, NOW - 30)
+    sync = HotspotSync(engine, lambda: store)
+    asyncio.run(sync.sync_once())
+    assert sync.store_has_rows
+
+    store.commit(2, NOW - 3600, NOW - 5)   # reported an hour ago, queued, committed late
+    store.commit(3, NOW - 40, NOW - 35)    # stamped before the last sync, visible only now
+    for i in range(4, 9):                  # several pages
+        store.commit(i, NOW - 20 + i, NOW - 20 + i)
+    asyncio.run(sync.sync_once())
+    asyncio.run(sync.sync_once())
+    assert engine.hotspots("24h", now=NOW)[0]["count"] == 8
+    assert store.max_page <= 2 and sync.since == NOW - 5
+
+
+def test_sync_counts_incidents_not_repeats(engine):
+    store = ChangesStore()
+    store.commit(1, NOW - 30, NOW - 30)
+    store.commit(2, NOW - 20, NOW - 20, duplicate=True)
+    asyncio.run(HotspotSync(engine, lambda: store).sync_once())
+    assert engine.hotspots("24h", now=NOW)[0]["count"] == 1
+
+
+def test_sync_notices_an_empty_store(engine):
+    sync = HotspotSync(engine, ChangesStore)
+    asyncio.run(sync.sync_once())
+    assert sync.store_has_rows is False
@@ -0,0 +1,100 @@
+# test_importtime.py — guard against slow server imports
+#
+#   python test_importtime.py            # print the -X importtime summary
+#   python -m pytest test_importtime.py  # fail if heavy modules load at import
+#
+# Importing combined_server or unified_server (which also mounts the
+# rag_server and predict_server routers) must not pull in the ML stack or
+# connect to Mongo; those load lazily / in the background warm-up.
+
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+MODULES = ["combined_server", "unified_server"]
+HEAVY_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "chromadb",
+    "google.generativeai",
+    "pandas",
+    "pymongo",
+    "motor",
+]
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "3000"))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class ImportFailed(RuntimeError):
+    def __init__(self, module, stderr):
+        super().__init__(f"import {module} failed:\n{stderr[-2000:]}")
+        # a third-party package that is not installed, as opposed to a broken import
+        m = re.search(r"ModuleNotFoundError: No module named '([\w.]+)'", stderr)
+        top = m.group(1).split(".")[0] if m else None
+        local = top and (os.path.exists(os.path.join(HERE, f"{top}.py"))
+                         or os.path.isdir(os.path.join(HERE, top)))
+        self.missing = None if local else top
+
+
+def profile_import(module):
+    """Return [(module, self_us, cumulative_us)] from `python -X importtime`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, timeout=120,
+        cwd=HERE,
+    )
+    if result.returncode != 0:
+        raise ImportFailed(module, result.stderr)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            parts = line[len("import time:"):].split("|")
+            self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].strip()
+        except (ValueError, IndexError):
+            continue
+        rows.append((name, self_us, cumulative_us))
+    return rows
+
+
+def summary(module, rows, top=15):
+    total_us = sum(r[1] for r in rows)
+    lines = [f"{module}: {len(rows)} modules, {total_us / 1000:.0f} ms total"]
+    top_level = [r for r in rows if "." not in r[0]]
+    for name, _, cumulative in sorted(top_level, key=lambda r: -r[2])[:top]:
+        lines.append(f"  {cumulative / 1000:8.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_server_import_is_light(module):
+    try:
+        rows = profile_import(module)
+    except ImportFailed as e:
+        if e.missing:
+            pytest.skip(f"{e.missing} is not installed")
+        pytest.fail(str(e))
+    print(summary(module, rows))
+
+    imported = {r[0] for r in rows}
+    heavy = [m for m in HEAVY_MODULES if m in imported]
+    assert not heavy, f"{module} imports heavy modules at import time: {heavy}"
+
+    total_ms = sum(r[1] for r in rows) / 1000
+    assert total_ms < IMPORT_BUDGET_MS, f"import took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
+
+
+if __name__ == "__main__":
+    for module in MODULES:
+        rows = profile_import(module)
+        print(summary(module, rows))
+        heavy = [m for m in HEAVY_MODULES if m in {r[0] for r in rows}]
+        if heavy:
+            print(f"✗ {module}: heavy modules imported eagerly: {', '.join(heavy)}")
+        else:
+            print(f"✓ {module}: no heavy modules imported at startup")
@@ -1,33 +1,253 @@
 # train_classifier.py
+#
+#   python train_classifier.py                       # model search, save the best models
+#   python train_classifier.py --quick               # previous behaviour: one LogisticRegression per target
+#   python train_classifier.py --max-features 5000,20000 --ngrams 1,2 --jobs 8
+#
+# The fitted TF-IDF matrix is cached in data/feature_cache/, keyed by a hash of
+# the complaint texts and the vectorizer parameters, so repeated experiments
+# skip tokenization. Every (vectorizer, estimator) candidate is cross-validated
+# for both targets in parallel; fit time, single-complaint predict latency and
+# accuracy are reported and written to models/training_report.json.
+#
+# Both targets share one vectorizer (models/vectorizer.pkl), so the vectorizer
+# with the best mean accuracy over the two targets is kept, and for each target
+# the cheapest estimator within --tolerance of the best accuracy on it.
+#
+# Note: the cached vectorizer is fit on all rows, so IDF weights see the
+# validation folds. That slightly flatters every candidate equally and keeps
+# the comparison fair while avoiding a re-fit per fold.
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import joblib
 import pandas as pd
+from joblib import Parallel, delayed
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-import joblib
-import os
+from sklearn.model_selection import StratifiedKFold, cross_validate
+from sklearn.naive_bayes import ComplementNB
+from sklearn.svm import LinearSVC
 
 DATA_PATH = "data/complaints_hdmc.csv"
+MODEL_DIR = "models"
+CACHE_DIR = "data/feature_cache"
+TARGETS = {"category": "Category", "urgency": "Urgency"}
+MODEL_FILES = {"category": "category_model.pkl", "urgency": "urgency_model.pkl"}
+
+
+def load_data(path=DATA_PATH):
+    df = pd.read_csv(path)
+    return df.dropna(subset=["ComplaintText", "Category", "Urgency"]).reset_index(drop=True)
+
+
+# ------------------------------------------------------
+# CACHED FEATURE MATRIX
+# ------------------------------------------------------
+def data_hash(texts):
+    h = hashlib.sha256()
+    for t in texts:
+        h.update(t.encode("utf8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def feature_matrix(texts, params, cache_dir=CACHE_DIR, digest=None):
+    """Return (fitted vectorizer, sparse matrix), reusing the on-disk cache when possible."""
+    digest = digest or data_hash(texts)
+    key = hashlib.sha256(f"{digest}:{json.dumps(params, sort_keys=True)}".encode()).hexdigest()[:24]
+    matrix_path = os.path.join(cache_dir, f"{key}.npz")
+    vec_path = os.path.join(cache_dir, f"{key}.vectorizer.pkl")
+
+    if os.path.exists(matrix_path) and os.path.exists(vec_path):
+        print(f"✓ Feature cache hit {key} {params}")
+        return joblib.load(vec_path), sparse.load_npz(matrix_path)
+
+    t0 = time.perf_counter()
+    vectorizer = TfidfVectorizer(**params)
+    X = vectorizer.fit_transform(texts)
+    print(f"✓ Vectorized {X.shape[0]} rows -> {X.shape[1]} features in "
+          f"{time.perf_counter() - t0:.2f}s {params}")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    sparse.save_npz(matrix_path, X.tocsr())
+    joblib.dump(vectorizer, vec_path)
+    return vectorizer, X
+
+
+def vectorizer_grid(max_features, ngrams):
+    return [{"stop_words": "english", "max_features": mf, "ngram_range": (1, n),
+             "sublinear_tf": n > 1}
+            for mf in max_features for n in ngrams]
+
+
+def estimator_grid():
+    return {
+        "logreg_C0.5": lambda: LogisticRegression(C=0.5, max_iter=2000),
+        "logreg_C1": lambda: LogisticRegression(max_iter=2000),
+        "logreg_C4": lambda: LogisticRegression(C=4, max_iter=2000),
+        "linearsvc_C0.5": lambda: LinearSVC(C=0.5),
+        "linearsvc_C1": lambda: LinearSVC(C=1.0),
+        "complementnb_a0.3": lambda: ComplementNB(alpha=0.3),
+        "complementnb_a1": lambda: ComplementNB(alpha=1.0),
+    }
+
+
+# ------------------------------------------------------
+# SEARCH
+# ------------------------------------------------------
+def _predict_ms(model, X, repeat=200):
+    """Median latency of predicting one complaint (what /predict does per request)."""
+    row = X[:1]
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        model.predict(row)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def evaluate(vec_id, target, name, make, X, y, folds):
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+    scores = cross_validate(make(), X, y, cv=cv, scoring=("accuracy", "f1_macro"),
+                            return_estimator=True, n_jobs=1)
+    return {
+        "vectorizer": vec_id,
+        "target": target,
+        "estimator": name,
+        "accuracy": round(float(scores["test_accuracy"].mean()), 4),
+        "accuracy_std": round(float(scores["test_accuracy"].std()), 4),
+        "f1_macro": round(float(scores["test_f1_macro"].mean()), 4),
+        "fit_s": round(float(scores["fit_time"].mean()), 4),
+        "predict_ms": round(_predict_ms(scores["estimator"][0], X), 4),
+    }
+
+
+def _transform_ms(vectorizer, texts, repeat=200):
+    samples = []
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        vectorizer.transform([texts[i % len(texts)]])
+        samples.append((time.perf_counter() - t0) * 1000)
+    return round(sorted(samples)[len(samples) // 2], 4)
+
+
+def search(df, vec_params, jobs=-1, folds=5):
+    texts = df["ComplaintText"].tolist()
+    digest = data_hash(texts)
+    features = [feature_matrix(texts, p, digest=digest) for p in vec_params]
+    estimators = estimator_grid()
+
+    tasks = []
+    for vec_id, (_, X) in enumerate(features):
+        for target, column in TARGETS.items():
+            y = df[column].values
+            k = max(2, min(folds, int(df[column].value_counts().min())))
+            for name, make in estimators.items():
+                tasks.append(delayed(evaluate)(vec_id, target, name, make, X, y, k))
+
+    t0 = time.perf_counter()
+    print(f"Cross-validating {len(tasks)} candidates on {jobs if jobs > 0 else os.cpu_count()} cores...")
+    results = Parallel(n_jobs=jobs)(tasks)
+    print(f"✓ Search finished in {time.perf_counter() - t0:.1f}s")
+
+    transform = [_transform_ms(v, texts) for v, _ in features]
+    for r in results:
+        r["transform_ms"] = transform[r["vectorizer"]]
+    return features, results
+
+
+def select(results, tolerance):
+    """Pick one vectorizer for both targets, then the cheapest near-best estimator per target."""
+    best = {}
+    for r in results:
+        key = (r["vectorizer"], r["target"])
+        best[key] = max(best.get(key, 0.0), r["accuracy"])
+    vec_ids = {r["vectorizer"] for r in results}
+    vec_id = max(vec_ids, key=lambda v: sum(best[(v, t)] for t in TARGETS) / len(TARGETS))
+
+    chosen = {}
+    for target in TARGETS:
+        pool = [r for r in results if r["vectorizer"] == vec_id and r["target"] == target]
+        top = max(r["accuracy"] for r in pool)
+        near = [r for r in pool if r["accuracy"] >= top - tolerance]
+        chosen[target] = min(near, key=lambda r: (r["predict_ms"], -r["accuracy"]))
+    return vec_id, chosen
+
+
+def print_report(results, vec_params):
+    for target in TARGETS:
+        print(f"\n{target}:")
+        print(f"  {'vec':>3} {'estimator':<18} {'acc':>7} {'±':>6} {'f1':>7} {'fit s':>7} "
+              f"{'pred ms':>8} {'vec ms':>7}")
+        for r in sorted((r for r in results if r["target"] == target), key=lambda r: -r["accuracy"]):
+            print(f"  {r['vectorizer']:>3} {r['estimator']:<18} {r['accuracy']:>7.4f} "
+                  f"{r['accuracy_std']:>6.4f} {r['f1_macro']:>7.4f} {r['fit_s']:>7.3f} "
+                  f"{r['predict_ms']:>8.4f} {r['transform_ms']:>7.4f}")
+    print("\nvectorizers:")
+    for i, p in enumerate(vec_params):
+        print(f"  {i}: {p}")
+
+
+# ------------------------------------------------------
+# MAIN
+# ------------------------------------------------------
+def save(vectorizer, models):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    joblib.dump(vectorizer, os.path.join(MODEL_DIR, "vectorizer.pkl"))
+    for target, model in models.items():
+        joblib.dump(model, os.path.join(MODEL_DIR, MODEL_FILES[target]))
+    print(f"🎉 Models trained & saved in /{MODEL_DIR}")
 
-df = pd.read_csv(DATA_PATH)
 
-df = df.dropna(subset=["ComplaintText", "Category", "Urgency"])
+def main():
+    parser = argparse.ArgumentParser(description="Train the category and urgency classifiers")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--quick", action="store_true",
+                        help="skip the search: TF-IDF(5000) + LogisticRegression for both targets")
+    parser.add_argument("--max-features", default="5000,20000")
+    parser.add_argument("--ngrams", default="1,2", help="max n-gram sizes to try")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--tolerance", type=float, default=0.005,
+                        help="accuracy an estimator may give up for lower predict latency")
+    args = parser.parse_args()
 
-X = df["ComplaintText"]
-y_cat = df["Category"]
-y_urg = df["Urgency"]
+    df = load_data(args.data)
+    texts = df["ComplaintText"].tolist()
 
-vectorizer = TfidfVectorizer(stop_words="english", max_features=5000)
-X_vec = vectorizer.fit_transform(X)
+    if args.quick:
+        vectorizer, X = feature_matrix(texts, {"stop_words": "english", "max_features": 5000})
+        models = {}
+        for target, column in TARGETS.items():
+            models[target] = LogisticRegression(max_iter=2000).fit(X, df[column])
+        save(vectorizer, models)
+        return
 
-cat_model = LogisticRegression(max_iter=2000)
-cat_model.fit(X_vec, y_cat)
+    vec_params = vectorizer_grid([int(x) for x in args.max_features.split(",")],
+                                 [int(x) for x in args.ngrams.split(",")])
+    features, results = search(df, vec_params, args.jobs, args.folds)
+    print_report(results, vec_params)
 
-urg_model = LogisticRegression(max_iter=2000)
-urg_model.fit(X_vec, y_urg)
+    vec_id, chosen = select(results, args.tolerance)
+    vectorizer, X = features[vec_id]
+    models = {}
+    for target, r in chosen.items():
+        print(f"✓ {target}: {r['estimator']} (accuracy {r['accuracy']}, predict {r['predict_ms']} ms)")
+        models[target] = estimator_grid()[r["estimator"]]().fit(X, df[TARGETS[target]])
+    save(vectorizer, models)
 
-os.makedirs("models", exist_ok=True)
+    report = {"data": args.data, "rows": len(df), "vectorizers": vec_params,
+              "selected": {"vectorizer": vec_id, **{t: r["estimator"] for t, r in chosen.items()}},
+              "results": results}
+    with open(os.path.join(MODEL_DIR, "training_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
 
-joblib.dump(vectorizer, "models/vectorizer.pkl")
-joblib.dump(cat_model, "models/category_model.pkl")
-joblib.dump(urg_model, "models/urgency_model.pkl")
 
-print("🎉 Models trained & saved in /models")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# unified_server.py — RAG, predict, combined and analytics APIs in one process
+#
+# Replaces the three uvicorn processes on 8000/8001/8002 with one app that
+# loads the SentenceTransformer and the joblib classifiers once.
+#
+#   uvicorn unified_server:app --port 8000                 # single worker
+#   python unified_server.py --port 8000 --workers 4       # pre-fork
+#
+# In pre-fork mode the parent loads the joblib classifiers and, with the torch
+# backend, the SentenceTransformer weights (no inference) and binds the socket
+# before forking, so workers share those pages copy-on-write. An onnxruntime
+# session (threads start with the session) and the Chroma client (SQLite
+# connection, background threads) are not fork-safe; each worker opens its own
+# in the startup warm-up after the fork. (Linux/macOS only; on Windows use
+# --workers 1.)
+
+import argparse
+import os
+import signal
+import socket
+import sys
+
+import runtime_config
+runtime_config.configure()
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+
+import combined_server
+import metrics
+import profiling
+from responses import CompressionMiddleware, FastJSONResponse
+import predict_server
+import rag_server
+from analytics_api import router as analytics_router
+from shared_models import models
+
+app = FastAPI(default_response_class=FastJSONResponse)
+
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # listing pagination, readable from the browser
+)
+
+app.mount("/uploads", StaticFiles(directory=combined_server.UPLOAD_DIR), name="uploads")
+app.mount("/annotated", StaticFiles(directory=combined_server.ANNOTATED_DIR), name="annotated")
+
+app.include_router(rag_server.router)        # /rag_query
+app.include_router(predict_server.router)    # /predict
+app.include_router(combined_server.router)   # /analyze, /hotspots, listings
+app.include_router(analytics_router)         # /timeline, /analytics/*
+app.include_router(metrics.router)           # /metrics
+app.include_router(profiling.router)         # /admin/*, only with ADMIN_TOKEN set
+
+
+@app.get("/models")
+def loaded_models():
+    return {"loaded": models.loaded(), "errors": models.errors, "pid": os.getpid()}
+
+
+def serve_prefork(host, port, workers):
+    import uvicorn
+
+    # Split cores between workers, then load the model weights before fork:
+    # children inherit them without copying. Nothing that owns threads or
+    # file handles may be opened here; see the module comment.
+    runtime_config.configure(workers=workers)
+    models.load_before_fork()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    print(f"✓ Unified server on http://{host}:{port} with {workers} workers")
+
+    children = []
+    for i in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            runtime_config.configure(workers=workers, worker_index=i)
+            config = uvicorn.Config(app, log_level="info")
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run all backend APIs in one process")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.workers > 1 and hasattr(os, "fork"):
+        serve_prefork(args.host, args.port, args.workers)
+    else:
+        import uvicorn
+
+        if args.workers > 1:
+            print("Pre-fork mode needs os.fork; running a single worker.", file=sys.stderr)
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,173 @@
+# uploads.py — streaming, size-limited, content-addressed upload storage
+#
+# Bodies are copied to disk in chunks while being hashed, so an upload never
+# has to sit in memory as one `bytes` object. Files land at
+# uploads/<sha[:2]>/<sha>.<ext>; re-uploading the same file is a no-op.
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "15")) * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/heic": ".heic",
+}
+
+
+@dataclass
+class StoredUpload:
+    path: str      # file on disk, hand this to downstream stages
+    sha256: str
+    size: int
+    url: str       # under the /uploads static mount
+    existed: bool  # identical content was already stored
+
+
+def check_content_length(request: Request, max_bytes=MAX_UPLOAD_BYTES):
+    """Reject oversized requests from the header alone, before reading the body.
+
+    Only effective for handlers that read the body themselves; multipart routes
+    are parsed before the handler runs, use UploadLimitMiddleware for those.
+    """
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise _too_large(max_bytes)
+
+
+def _too_large(max_bytes):
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB")
+
+
+class UploadLimitMiddleware:
+    """Enforce the upload cap before any route (or multipart parser) sees the body.
+
+    A route that declares UploadFile has its whole body spooled to disk by the
+    form parser before the handler runs, so the cap has to live in front of it:
+    an oversized Content-Length is rejected without reading anything, and a
+    body that keeps coming past max_bytes (chunked, or a lying header) is cut
+    off as soon as it crosses the limit.
+    """
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES, paths=("/",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": _too_large(self.max_bytes).detail}).encode()
+        await send({"type": "http.response.start", "status": 413,
+                    "headers": [(b"content-type", b"application/json"),
+                                (b"content-length", str(len(body)).encode()),
+                                (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            return await self.app(scope, receive, send)
+
+        length = next((v for k, v in scope["headers"] if k == b"content-length"), b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large(self.max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            # FastAPI routes turn the exception into a response themselves;
+            # this covers anything that let it escape before responding
+            if e.status_code != 413 or started:
+                raise
+            await self._reject(send)
+
+
+def _extension(content_type, filename):
+    if content_type in EXTENSIONS:
+        return EXTENSIONS[content_type]
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in EXTENSIONS.values() or ext == ".jpeg" else ".bin"
+
+
+async def store_chunks(chunks, content_type=None, filename=None, max_bytes=MAX_UPLOAD_BYTES):
+    """Write an async iterator of byte chunks to a content-addressed file."""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    tmp = os.path.join(UPLOAD_DIR, f".incoming-{os.getpid()}-{id(digest)}")
+    f = open(tmp, "wb")
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+        f.close()
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
+
+        sha = digest.hexdigest()
+        ext = _extension(content_type, filename)
+        rel = f"{sha[:2]}/{sha}{ext}"
+        path = os.path.join(UPLOAD_DIR, rel)
+        existed = os.path.exists(path)
+        if existed:
+            os.unlink(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        return StoredUpload(path=path, sha256=sha, size=size, url=f"/uploads/{rel}", existed=existed)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+async def _iter_upload_file(file):
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def save_upload(file, max_bytes=MAX_UPLOAD_BYTES):
+    """Store a multipart UploadFile (already spooled by Starlette) chunk by chunk."""
+    return await store_chunks(_iter_upload_file(file), file.content_type, file.filename, max_bytes)
+
+
+async def save_request_body(request: Request, max_bytes=MAX_UPLOAD_BYTES):
+    """Store a raw request body as it arrives off the socket."""
+    check_content_length(request, max_bytes)
+    return await store_chunks(
+        request.stream(), request.headers.get("content-type"), None, max_bytes
+    )
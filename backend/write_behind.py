@@ -0,0 +1,121 @@
+# write_behind.py — batched, asynchronous persistence of analyzed complaints
+#
+# /analyze hands each result to `writer.put()` and returns without waiting
+# for the database. A background task drains the queue and writes batches
+# through complaint_store (one executemany transaction on SQLite, one
+# insert_many + rollup bulk_write on MongoDB) whenever FLUSH_BATCH documents
+# are waiting or FLUSH_INTERVAL_S has passed since the first one arrived.
+#
+# The queue is bounded: if the database falls behind by WRITE_QUEUE_MAX
+# documents, put() waits for room instead of growing memory without limit.
+# stop() flushes whatever is still queued (called on shutdown).
+
+import asyncio
+import os
+import time
+
+import metrics
+
+FLUSH_BATCH = int(os.getenv("WRITE_FLUSH_BATCH", "200"))
+FLUSH_INTERVAL_S = float(os.getenv("WRITE_FLUSH_INTERVAL_S", "1.0"))
+WRITE_QUEUE_MAX = int(os.getenv("WRITE_QUEUE_MAX", "10000"))
+WRITE_RETRIES = 3
+
+QUEUE_DEPTH = metrics.Gauge("civic_write_queue_depth", "Complaints waiting to be persisted")
+BATCH_SIZE = metrics.Histogram("civic_write_batch_size", "Complaints per persisted batch",
+                               buckets=(1, 5, 10, 25, 50, 100, 200, 500, 1000))
+WRITTEN = metrics.Counter("civic_complaints_written_total", "Complaints persisted, by result", ["result"])
+
+
+class WriteBehindWriter:
+    def __init__(self, get_store, batch=FLUSH_BATCH, interval=FLUSH_INTERVAL_S,
+                 max_queue=WRITE_QUEUE_MAX):
+        self.get_store = get_store
+        self.batch = batch
+        self.interval = interval
+        self.max_queue = max_queue
+        self._queue = None
+        self._task = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_flush_ms = None
+
+    def start(self):
+        """Start the flush loop on the running event loop (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def put(self, doc):
+        """Queue one complaint; waits only when the queue is full (back-pressure)."""
+        if self._task is None or self._task.done():
+            self.start()
+        await self._queue.put(doc)
+        QUEUE_DEPTH.set(value=self._queue.qsize())
+
+    async def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or self._stopping:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # take anything else already queued, up to the batch size
+            while len(batch) < self.batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            QUEUE_DEPTH.set(value=self._queue.qsize())
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        delay = 0.5
+        for attempt in range(1, WRITE_RETRIES + 1):
+            t0 = time.perf_counter()
+            try:
+                await self.get_store().add_many(batch)
+            except Exception as e:
+                metrics.record_error("write_behind", e)
+                if attempt == WRITE_RETRIES:
+                    self.dropped += len(batch)
+                    WRITTEN.inc("dropped", n=len(batch))
+                    return
+                await asyncio.sleep(delay)
+                delay *= 2
+                continue
+            self.last_flush_ms = round((time.perf_counter() - t0) * 1000, 2)
+            self.written += len(batch)
+            self.batches += 1
+            WRITTEN.inc("ok", n=len(batch))
+            BATCH_SIZE.observe(value=len(batch))
+            return
+
+    async def stop(self):
+        """Flush everything still queued and stop the loop."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "avg_batch": round(self.written / self.batches, 1) if self.batches else 0,
+            "last_flush_ms": self.last_flush_ms,
+        }
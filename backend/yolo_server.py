@@ -1,14 +1,32 @@
-import os
 import base64
-import requests
-from fastapi import FastAPI, UploadFile, File
+import hashlib
+import json
+import os
+import tempfile
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from io import BytesIO
-from PIL import Image
 
-app = FastAPI()
+import metrics
+from metrics import stage
+from responses import CompressionMiddleware, FastJSONResponse
+from detection_cache import DetectionCache, dhash, normalize_boxes, denormalize_boxes
+from image_prep import prepare, scale_predictions
+from roboflow_client import RoboflowClient, DetectionError, render_boxes
+from uploads import UPLOAD_DIR, UploadLimitMiddleware, save_upload, save_request_body
+
+ANNOTATED_DIR = "annotated"
+os.makedirs(ANNOTATED_DIR, exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# innermost, so 413s still get CORS headers; runs before multipart parsing
+app.add_middleware(UploadLimitMiddleware, paths=("/yolo",))
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -17,47 +35,135 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
-PROJECT = "civic-issue"
-WORKSPACE = "beshu"
-VERSION = 1   # your Roboflow version
+# Annotated images are immutable (content-addressed), served with ETag/range support
+app.mount("/annotated", StaticFiles(directory=ANNOTATED_DIR), name="annotated")
+app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+app.include_router(metrics.router)
 
-YOLO_URL = (
-    f"https://detect.roboflow.com/{PROJECT}/{VERSION}"
-    f"?api_key={ROBOFLOW_API_KEY}&format=json"
-)
+# One pooled keep-alive client for the whole process
+detector = RoboflowClient()
+cache = DetectionCache()
+
+
+@app.on_event("shutdown")
+async def close_detector():
+    await detector.aclose()
 
-RENDER_URL = (
-    f"https://detect.roboflow.com/{PROJECT}/{VERSION}"
-    f"?api_key={ROBOFLOW_API_KEY}&format=image&confidence=0.4"
-)
 
 class DetectionResponse(BaseModel):
     detections: list
-    rendered_image: str | None  # base64
+    rendered_image_url: str | None = None
+    rendered_image: str | None = None  # base64, only with ?inline=true
+    upload_url: str | None = None
     width: int
     height: int
+    cached: bool = False
+    duplicate_of: str | None = None  # sha256 of an earlier near-identical upload
+    duplicate_distance: int | None = None
+
+
+def render_image(image, detections, key):
+    """
+    Draw boxes on the downscaled image and save it as annotated/<key>.jpg
+    (CPU-bound, runs off the event loop). The same key always yields the same
+    image, so an existing file is reused as-is.
+    """
+    name = f"{key}.jpg"
+    path = os.path.join(ANNOTATED_DIR, name)
+    if not os.path.exists(path):
+        # unique temp name: two identical uploads may render the same key at once
+        fd, tmp = tempfile.mkstemp(dir=ANNOTATED_DIR, prefix=".rendering-", suffix=".jpg")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                render_boxes(image, detections).save(f, format="JPEG", quality=85)
+            os.replace(tmp, path)
+        except OSError:
+            # losing the rename race (e.g. the target is open on Windows) is fine:
+            # the winner wrote identical bytes
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+    return f"/annotated/{name}", path
 
 
 @app.post("/yolo", response_model=DetectionResponse)
-async def detect_image(file: UploadFile = File(...)):
-    image_bytes = await file.read()
+async def detect_image(file: UploadFile = File(...), inline: bool = False):
+    stored = await save_upload(file)
+    return await run_detection(stored, inline)
 
-    # 1. JSON Detection
-    json_resp = requests.post(YOLO_URL, files={"file": image_bytes})
-    detections_json = json_resp.json().get("predictions", [])
 
-    # 2. Rendered fallback (Roboflow rendered boxes)
-    render_resp = requests.post(RENDER_URL, files={"file": image_bytes})
-    b64_img = base64.b64encode(render_resp.content).decode()
+@app.post("/yolo/raw", response_model=DetectionResponse)
+async def detect_raw_image(request: Request, inline: bool = False):
+    """Same as /yolo, but the body is the image itself and is streamed straight to disk."""
+    stored = await save_request_body(request)
+    return await run_detection(stored, inline)
 
-    # Get image dimensions (for canvas scaling)
-    img = Image.open(BytesIO(image_bytes))
-    w, h = img.size
+
+async def run_detection(stored, inline=False):
+    sha = stored.sha256
+
+    # Orient + downscale to the detector's input size before uploading
+    try:
+        with stage("preprocess"):
+            prepared = await run_in_threadpool(prepare, stored.path)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
+
+    sw, sh = prepared.image.size
+    cached, duplicate_of, distance = True, None, None
+
+    # Exact re-upload, then near-identical photo, before paying for a remote call
+    with stage("cache_lookup"):
+        boxes = await run_in_threadpool(cache.get_exact, sha)
+        metrics.cache_result("detection_exact", boxes is not None)
+        if boxes is not None:
+            duplicate_of, distance = sha, 0
+        else:
+            h = await run_in_threadpool(dhash, prepared.image)
+            near = await run_in_threadpool(cache.get_near, h)
+            metrics.cache_result("detection_near", near is not None)
+            if near is not None:
+                duplicate_of, distance, boxes = near
+
+    if boxes is not None:
+        detections_small = denormalize_boxes(boxes, sw, sh)
+    else:
+        cached = False
+        # Single remote call: JSON predictions only, boxes are drawn locally
+        try:
+            with stage("detect"):
+                detections_small = await detector.detect(prepared.data)
+        except DetectionError as e:
+            metrics.record_error("detect", e)
+            raise HTTPException(status_code=502, detail=f"Detection failed: {e}")
+        await run_in_threadpool(cache.put, sha, h, normalize_boxes(detections_small, sw, sh))
+
+    render_key = hashlib.sha256(
+        prepared.data + json.dumps(detections_small, sort_keys=True).encode()
+    ).hexdigest()
+    with stage("render"):
+        url, path = await run_in_threadpool(render_image, prepared.image, detections_small, render_key)
+
+    b64_img = None
+    if inline:
+        with open(path, "rb") as f:
+            b64_img = base64.b64encode(f.read()).decode()
 
     return DetectionResponse(
-        detections=detections_json,
+        detections=scale_predictions(detections_small, prepared.scale_x, prepared.scale_y),
+        rendered_image_url=url,
         rendered_image=b64_img,
-        width=w,
-        height=h
-    )
\ No newline at end of file
+        upload_url=stored.url,
+        width=prepared.width,
+        height=prepared.height,
+        cached=cached,
+        duplicate_of=duplicate_of,
+        duplicate_distance=distance,
+    )
+
+
+@app.get("/yolo/cache")
+def cache_stats():
+    return cache.stats()
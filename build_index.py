@@ -1,19 +1,30 @@
 # build_index.py
 import os
+import sys
 import json
+from itertools import islice
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import chromadb
 
+# shared embedder backends and chunker live in backend/rag (EMBEDDER_BACKEND=torch|onnx|onnx-int8)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from rag.chunker import chunk_spans, iter_file_chunks
+from rag.embedder import get_embedder
+
 DATA_DIR = Path("rag_data")
 MODEL_NAME = "all-MiniLM-L6-v2"
 COLLECTION_NAME = "hdmc_rag"
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+STREAM_BYTES = 32 * 1024 * 1024   # .txt/.md files above this are chunked while reading
+BATCH_SIZE = 512                  # chunks embedded and added per batch
 
 def load_text_files(data_dir):
     docs = []
     for p in sorted(data_dir.iterdir()):
-        if p.suffix.lower() in [".txt", ".md"]:
+        if p.suffix.lower() in [".txt", ".md"] and p.stat().st_size > STREAM_BYTES:
+            docs.append({"source": p.name, "path": p})  # chunked lazily in iter_chunks
+        elif p.suffix.lower() in [".txt", ".md"]:
             docs.append({"source": p.name, "text": p.read_text(encoding="utf8")})
         elif p.suffix.lower() == ".json":
             try:
@@ -28,18 +39,29 @@ def load_text_files(data_dir):
                 docs.append({"source": p.name, "text": p.read_text(encoding="utf8")})
     return docs
 
-def chunk_documents(docs):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=80)
-    all_chunks = []
+def iter_chunks(docs):
+    """Yield chunk dicts; offsets are characters into the source document."""
     for d in docs:
-        chunks = splitter.split_text(d["text"])
-        for i, c in enumerate(chunks):
-            all_chunks.append({"id": f"{d['source']}__{i}", "text": c, "source": d['source']})
-    return all_chunks
+        if "path" in d:
+            spans = iter_file_chunks(d["path"], d["source"], CHUNK_SIZE, CHUNK_OVERLAP)
+        else:
+            spans = ((s, s.text(d["text"])) for s in chunk_spans(d["text"], CHUNK_SIZE, CHUNK_OVERLAP))
+        for i, (span, text) in enumerate(spans):
+            yield {"id": f"{d['source']}__{i}", "text": text, "source": d["source"],
+                   "start": span.start, "end": span.end}
+
+def chunk_documents(docs):
+    return list(iter_chunks(docs))
+
+def batched(iterable, n):
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
 
 def embed_and_store(chunks, model_name=MODEL_NAME):
+    """chunks may be any iterable; it is embedded and stored BATCH_SIZE at a time."""
     print("Loading embedder:", model_name)
-    embedder = SentenceTransformer(model_name)
+    embedder = get_embedder(model_name=model_name)
     # Use persistent ChromaDB client
     print("Creating persistent ChromaDB client at ./backend/chroma")
     chroma_client = chromadb.PersistentClient(path="./backend/chroma")
@@ -53,20 +75,23 @@ def embed_and_store(chunks, model_name=MODEL_NAME):
         pass
     print("Creating new collection...")
     collection = chroma_client.create_collection(COLLECTION_NAME)
-    texts = [c["text"] for c in chunks]
-    ids = [c["id"] for c in chunks]
-    sources = [c["source"] for c in chunks]
-    print("Embedding", len(texts), "chunks — this may take a while...")
-    embeddings = embedder.encode(texts, show_progress_bar=True, convert_to_numpy=True)
-    # add to chroma collection
-    print("Adding documents to collection...")
-    collection.add(ids=ids, documents=texts, metadatas=[{"source": s} for s in sources], embeddings=embeddings.tolist())
-    print("Stored", len(ids), "chunks into ChromaDB collection:", COLLECTION_NAME)
+    print("Embedding chunks — this may take a while...")
+    stored = 0
+    for batch in batched(chunks, BATCH_SIZE):
+        texts = [c["text"] for c in batch]
+        embeddings = embedder.encode(texts, convert_to_numpy=True)
+        collection.add(
+            ids=[c["id"] for c in batch],
+            documents=texts,
+            metadatas=[{"source": c["source"], "start": c["start"], "end": c["end"]} for c in batch],
+            embeddings=embeddings.tolist(),
+        )
+        stored += len(batch)
+        print(f"  {stored} chunks stored", end="\r")
+    print("Stored", stored, "chunks into ChromaDB collection:", COLLECTION_NAME)
 
 if __name__ == "__main__":
     print("Loading documents from", DATA_DIR)
     docs = load_text_files(DATA_DIR)
     print("Loaded", len(docs), "documents.")
-    chunks = chunk_documents(docs)
-    print("Created", len(chunks), "chunks.")
-    embed_and_store(chunks)
\ No newline at end of file
+    embed_and_store(iter_chunks(docs))
\ No newline at end of file
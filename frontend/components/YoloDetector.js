@@ -23,7 +23,7 @@ export default function YoloDetector() {
     const data = await res.json();
 
     setDetections(data.detections);
-    setRenderedImage(`data:image/png;base64,${data.rendered_image}`);
+    setRenderedImage(`http://127.0.0.1:8001${data.rendered_image_url}`);
 
     drawCanvasBoxes(localURL, data.detections, data.width, data.height);
   };
@@ -11,6 +11,26 @@ const UltraSmartCityMap = dynamic(
   { ssr: false }
 );
 
+// /complaints/map is paginated newest first: follow next_cursor for at most
+// MAP_PAGES pages, so the map shows the latest MAP_PAGES x 1000 reports
+// instead of downloading the whole store
+const MAP_PAGES = 3;
+
+async function loadMapData() {
+  const items = [];
+  let cursor = null;
+  for (let i = 0; i < MAP_PAGES; i++) {
+    const url = `http://localhost:8005/complaints/map?limit=1000${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`;
+    const res = await fetch(url);
+    if (!res.ok) throw new Error(`Map data fetch failed: ${res.status}`);
+    const page = await res.json();
+    items.push(...page.data);
+    cursor = page.next_cursor;
+    if (!cursor) break;
+  }
+  return items;
+}
+
 export default function Dashboard() {
   const [loading, setLoading] = useState(false);
   const [timeline, setTimeline] = useState(null);
@@ -32,9 +52,8 @@ export default function Dashboard() {
       .catch(err => console.error("Timeline fetch error:", err));
       
     // Fetch map data
-    fetch("http://localhost:8005/complaints/map")
-      .then(res => res.json())
-      .then(data => setMapData(data.data))
+    loadMapData()
+      .then(data => setMapData(data))
       .catch(err => console.error("Map data fetch error:", err));
       
     // Load history from localStorage
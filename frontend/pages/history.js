@@ -1,24 +1,50 @@
 import Layout from "../components/Layout";
 import LoadingScanner from "../components/LoadingScanner";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
+
+const HISTORY_URL = "http://127.0.0.1:8004/history";
+const PAGE_SIZE = 60;
+
+// /history is paginated: one page per call, X-Next-Cursor points at the next
+async function loadHistoryPage(cursor) {
+  const url = `${HISTORY_URL}?limit=${PAGE_SIZE}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`;
+  const res = await fetch(url);
+  if (!res.ok) throw new Error(`History fetch failed: ${res.status}`);
+  return { items: await res.json(), next: res.headers.get("X-Next-Cursor") };
+}
 
 export default function HistoryPage() {
   const [history, setHistory] = useState([]);
   const [loading, setLoading] = useState(false);
+  // undefined: first page not loaded yet; null: no more pages
+  const [cursor, setCursor] = useState(undefined);
+  const sentinel = useRef(null);
 
-  useEffect(() => {
+  function loadMore() {
+    if (loading || cursor === null) return;
     setLoading(true);
-    fetch("http://127.0.0.1:8004/history")
-      .then(res => res.json())
-      .then(data => {
-        setHistory(data);
+    loadHistoryPage(cursor)
+      .then(page => {
+        setHistory(prev => [...prev, ...page.items]);
+        setCursor(page.next);
         setLoading(false);
       })
       .catch(err => {
         console.error("History fetch error:", err);
+        setCursor(null);
         setLoading(false);
       });
-  }, []);
+  }
+
+  // fetch the next page when the end of the list scrolls into view
+  useEffect(() => {
+    if (!sentinel.current) return;
+    const observer = new IntersectionObserver(entries => {
+      if (entries[0].isIntersecting) loadMore();
+    }, { rootMargin: "400px" });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [cursor, loading]);
 
   return (
     <Layout>
@@ -63,6 +89,7 @@ export default function HistoryPage() {
             </div>
           ))}
         </div>
+        {cursor !== null && <div ref={sentinel} className="h-1" />}
       </div>
     </Layout>
   );
@@ -1,14 +1,19 @@
 # rag_server.py (Gemini RAG version)
 import os
+import sys
 import json
+from pathlib import Path
 from fastapi import FastAPI
 from pydantic import BaseModel
-from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+# shared embedder backends live in backend/rag (EMBEDDER_BACKEND=torch|onnx|onnx-int8)
+sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+from rag.embedder import get_embedder
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -33,7 +38,7 @@ app.add_middleware(
 
 # ---- Embedding Model ----
 EMBED_MODEL = "all-MiniLM-L6-v2"
-embedder = SentenceTransformer(EMBED_MODEL)
+embedder = get_embedder(model_name=EMBED_MODEL)
 
 # ---- ChromaDB ----
 COLLECTION_NAME = "hdmc_rag"
@@ -38,7 +38,6 @@ def check_required_packages():
     required_packages = [
         "fastapi",
         "uvicorn",
-        "langchain",
         "chromadb",
         "sentence-transformers",
         "google-generativeai",